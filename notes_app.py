@@ -24,156 +24,403 @@ from ttkbootstrap.constants import *
 from datetime import datetime
 import time
 import os
-from PIL import Image, ImageTk, ImageGrab
 import io
-import base64
 import json
+import logging
+import re
+import atexit
+import queue
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+
+# <- Errors from the editor handlers are logged, only Tcl and file errors are expected there ->
+_log = logging.getLogger(__name__)
+
+# <- orjson is much faster on the large images payload; fall back to the standard library if it is missing ->
+try:
+    import orjson
+
+    def _dumps(obj):
+        return orjson.dumps(obj).decode('utf-8')
+
+    _loads = orjson.loads
+except ImportError:
+    _dumps = json.dumps
+    _loads = json.loads
 
 DATABASE = 'advanced_notes.db'
-
-def create_tables():
-    conn = sqlite3.connect(DATABASE)
-    c = conn.cursor()
-    
-    # <- Tables are created for saving the file ->
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS notes (
-            id INTEGER PRIMARY KEY,
-            title TEXT NOT NULL,
-            content TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP,
-            images TEXT,
-            formatting TEXT
-        )
-    ''')
-    
-    # <- Table for settings ->
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS settings (
-            id INTEGER PRIMARY KEY,
-            theme TEXT DEFAULT 'dark',
-            font_family TEXT DEFAULT 'Arial',
-            font_size INTEGER DEFAULT 12
-        )
-    ''')
-    
-    # <- This checks whether there is a table or not. If no table found then it will create a table ->
-    cursor = conn.execute('PRAGMA table_info(notes)')
-    columns = [column[1] for column in cursor.fetchall()]
+READ_POOL_SIZE = 2
+STATEMENT_CACHE_SIZE = 128
+
+def _configure(conn, readonly=False):
+    # <- WAL turns every save into an append to the -wal file instead of a rollback journal rewrite ->
+    if not readonly:
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute('PRAGMA temp_store=MEMORY')
+    conn.execute('PRAGMA cache_size=-8000')
+    conn.execute('PRAGMA busy_timeout=5000')
+    conn.execute('PRAGMA mmap_size=268435456')
     
-    if 'images' not in columns:
+    # <- Rows can be read by column name as well as by position ->
+    conn.row_factory = sqlite3.Row
+    return conn
+
+# <- One read/write connection is shared by every helper instead of reconnecting per call ->
+_CONN = _configure(sqlite3.connect(DATABASE, check_same_thread=False, isolation_level=None, cached_statements=STATEMENT_CACHE_SIZE))
+_CONN_LOCK = threading.Lock()
+
+# <- A small pool of read-only connections for the list and lookup queries ->
+_READ_POOL = queue.Queue()
+for _ in range(READ_POOL_SIZE):
+    _READ_POOL.put(_configure(sqlite3.connect(f"file:{DATABASE}?mode=ro", uri=True, check_same_thread=False, 
+            cached_statements=STATEMENT_CACHE_SIZE), readonly=True))
+
+@contextmanager
+def _writer():
+    # <- Each burst of writes runs inside one transaction so it costs a single commit ->
+    with _CONN_LOCK:
+        c = _CONN.cursor()
+        c.execute('BEGIN IMMEDIATE')
         try:
-            c.execute('ALTER TABLE notes ADD COLUMN images TEXT')
-        except sqlite3.Error as e:
-            print(f"Database migration error: {e}")
-    
-    # <- Checking for formatting. If not done then the code does it ->
-    if 'formatting' not in columns:
-        try:
-            c.execute('ALTER TABLE notes ADD COLUMN formatting TEXT')
-        except sqlite3.Error as e:
-            print(f"Database migration error: {e}")
-    
-    # <- Whether the settings have one row or not ->
-    c.execute('SELECT COUNT(*) FROM settings')
-    if c.fetchone()[0] == 0:
-        c.execute('INSERT INTO settings (theme, font_family, font_size) VALUES (?, ?, ?)', 
-                ('dark', 'Arial', 12))
-    
-    conn.commit()
-    conn.close()
+            yield c
+        except BaseException:
+            c.execute('ROLLBACK')
+            raise
+        c.execute('COMMIT')
+
+@contextmanager
+def _reader():
+    conn = _READ_POOL.get()
+    try:
+        yield conn.cursor()
+    finally:
+        _READ_POOL.put(conn)
+
+def _close_connections():
+    while not _READ_POOL.empty():
+        _READ_POOL.get_nowait().close()
+    _CONN.close()
+
+atexit.register(_close_connections)
+
+SCHEMA_VERSION = 5
+
+def create_tables():
+    with _writer() as c:
+        # <- The schema version is kept in the database so an up-to-date file skips the migration checks ->
+        c.execute('PRAGMA user_version')
+        version = c.fetchone()[0]
+        if version >= SCHEMA_VERSION:
+            return
+        
+        if version < 2:
+            # <- Tables are created for saving the file ->
+            c.execute('''
+                CREATE TABLE IF NOT EXISTS notes (
+                    id INTEGER PRIMARY KEY,
+                    title TEXT NOT NULL,
+                    content TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    updated_at TIMESTAMP,
+                    images TEXT,
+                    formatting TEXT
+                )
+            ''')
+            
+            # <- Table for settings ->
+            c.execute('''
+                CREATE TABLE IF NOT EXISTS settings (
+                    id INTEGER PRIMARY KEY,
+                    theme TEXT DEFAULT 'dark',
+                    font_family TEXT DEFAULT 'Arial',
+                    font_size INTEGER DEFAULT 12
+                )
+            ''')
+            
+            # <- This checks whether there is a table or not. If no table found then it will create a table ->
+            c.execute('PRAGMA table_info(notes)')
+            columns = [column['name'] for column in c]
+            
+            if 'images' not in columns:
+                try:
+                    c.execute('ALTER TABLE notes ADD COLUMN images TEXT')
+                except sqlite3.Error as e:
+                    print(f"Database migration error: {e}")
+            
+            # <- Checking for formatting. If not done then the code does it ->
+            if 'formatting' not in columns:
+                try:
+                    c.execute('ALTER TABLE notes ADD COLUMN formatting TEXT')
+                except sqlite3.Error as e:
+                    print(f"Database migration error: {e}")
+            
+            # <- Whether the settings have one row or not ->
+            c.execute('SELECT COUNT(*) FROM settings')
+            if c.fetchone()[0] == 0:
+                c.execute('INSERT INTO settings (theme, font_family, font_size) VALUES (?, ?, ?)', 
+                        ('dark', 'Arial', 12))
+        
+        if version < 3:
+            # <- Images live in their own table as raw bytes so saving a note does not rewrite them ->
+            c.execute('''
+                CREATE TABLE IF NOT EXISTS note_images (
+                    note_id INTEGER,
+                    key TEXT,
+                    blob BLOB,
+                    PRIMARY KEY (note_id, key)
+                )
+            ''')
+            
+            # <- Move images that older versions stored as base64 JSON inside the notes row, only this needs base64 ->
+            import base64
+            c.execute("SELECT id, images FROM notes WHERE images IS NOT NULL AND images NOT IN ('', '{}')")
+            for note_id, images_str in c.fetchall():
+                try:
+                    images = _loads(images_str)
+                    rows = [(note_id, key, base64.b64decode(data)) for key, data in images.items()]
+                except (ValueError, AttributeError) as e:
+                    print(f"Database migration error for note {note_id}: {e}")
+                    continue
+                c.executemany('INSERT OR IGNORE INTO note_images (note_id, key, blob) VALUES (?, ?, ?)', rows)
+                c.execute('UPDATE notes SET images = ? WHERE id = ?', (_dumps(list(images)), note_id))
+        
+        if version < 4:
+            # <- Covering index so the note lists are read in order straight from the index ->
+            c.execute('CREATE INDEX IF NOT EXISTS idx_notes_updated ON notes (updated_at DESC, id, title)')
+        
+        if version < 5:
+            # <- updated_at becomes unix milliseconds, so the table is rebuilt with an INTEGER column ->
+            c.execute('''
+                CREATE TABLE notes_new (
+                    id INTEGER PRIMARY KEY,
+                    title TEXT NOT NULL,
+                    content TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    updated_at INTEGER,
+                    images TEXT,
+                    formatting TEXT
+                )
+            ''')
+            
+            # <- Old updated_at values are local time text, created_at is UTC text from CURRENT_TIMESTAMP ->
+            c.execute('''
+                INSERT INTO notes_new (id, title, content, created_at, updated_at, images, formatting)
+                SELECT id, title, content, created_at,
+                       COALESCE(CAST(strftime('%s', updated_at, 'utc') AS INTEGER),
+                                CAST(strftime('%s', created_at) AS INTEGER)) * 1000,
+                       images, formatting
+                FROM notes
+            ''')
+            c.execute('DROP TABLE notes')
+            c.execute('ALTER TABLE notes_new RENAME TO notes')
+            c.execute('CREATE INDEX idx_notes_updated ON notes (updated_at DESC, id, title)')
+        
+        c.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+
+# <- The statements are kept as constants so every call hands the same SQL to the connection's statement cache ->
+_SQL_GET_SETTINGS = 'SELECT theme, font_family, font_size FROM settings WHERE id = 1'
+_SQL_SAVE_SETTINGS = 'UPDATE settings SET theme = ?, font_family = ?, font_size = ? WHERE id = 1'
+_SQL_IMAGE_KEYS = 'SELECT key FROM note_images WHERE note_id = ?'
+_SQL_INSERT_IMAGE = 'INSERT INTO note_images (note_id, key, blob) VALUES (?, ?, ?)'
+_SQL_DELETE_IMAGE = 'DELETE FROM note_images WHERE note_id = ? AND key = ?'
+_SQL_INSERT_NOTE = 'INSERT INTO notes (title, content, updated_at, formatting) VALUES (?, ?, ?, ?)'
+_SQL_UPDATE_NOTE = 'UPDATE notes SET title = ?, content = ?, updated_at = ?, formatting = ? WHERE id = ?'
+_SQL_LIST_NOTES = 'SELECT id, title FROM notes ORDER BY updated_at DESC'
+_SQL_RECENT_NOTES = 'SELECT id, title, updated_at FROM notes ORDER BY updated_at DESC LIMIT ?'
+_SQL_GET_NOTE = 'SELECT title, content, formatting FROM notes WHERE id = ?'
+_SQL_GET_IMAGES = 'SELECT key, blob FROM note_images WHERE note_id = ?'
+_SQL_DELETE_NOTE_IMAGES = 'DELETE FROM note_images WHERE note_id = ?'
+_SQL_DELETE_NOTE = 'DELETE FROM notes WHERE id = ?'
 
 def get_settings():
-    conn = sqlite3.connect(DATABASE)
-    c = conn.cursor()
-    c.execute('SELECT theme, font_family, font_size FROM settings WHERE id = 1')
-    settings = c.fetchone()
-    conn.close()
+    with _reader() as c:
+        c.execute(_SQL_GET_SETTINGS)
+        settings = c.fetchone()
     
     if not settings:
         return {'theme': 'dark', 'font_family': 'Arial', 'font_size': 12}
     
     return {
-        'theme': settings[0],
-        'font_family': settings[1],
-        'font_size': settings[2]
+        'theme': settings['theme'],
+        'font_family': settings['font_family'],
+        'font_size': settings['font_size']
     }
 
 def save_settings(settings):
-    conn = sqlite3.connect(DATABASE)
-    c = conn.cursor()
-    c.execute('UPDATE settings SET theme = ?, font_family = ?, font_size = ? WHERE id = 1', 
-            (settings['theme'], settings['font_family'], settings['font_size']))
-    conn.commit()
-    conn.close()
+    with _writer() as c:
+        c.execute(_SQL_SAVE_SETTINGS, 
+                (settings['theme'], settings['font_family'], settings['font_size']))
 
-def save_note_to_db(title, content, images_data, formatting_data):
-    conn = sqlite3.connect(DATABASE)
-    c = conn.cursor()
+def _write_images(c, note_id, images_data):
+    c.execute(_SQL_IMAGE_KEYS, (note_id,))
+    stored = {row['key'] for row in c}
     
-    # <- Images are being converted into JSON Strings ->
-    images_str = json.dumps(images_data) if images_data else "{}"
+    # <- Image keys are never reused within a note, so only new images need writing ->
+    c.executemany(_SQL_INSERT_IMAGE, 
+            [(note_id, key, data) for key, data in images_data.items() if key not in stored])
     
-    # <- Formatting data coverting into JSON Strings ->
-    formatting_str = json.dumps(formatting_data) if formatting_data else "{}"
-    
-    c.execute('INSERT INTO notes (title, content, updated_at, images, formatting) VALUES (?, ?, ?, ?, ?)', 
-            (title, content, datetime.now(), images_str, formatting_str))
+    # <- Images that are no longer part of the note are dropped ->
+    c.executemany(_SQL_DELETE_IMAGE, 
+            [(note_id, key) for key in stored.difference(images_data)])
+
+def _insert_note(c, title, content, images_data, formatting_data, updated_at):
+    # <- Formatting data coverting into JSON Strings, the images only live in note_images ->
+    formatting_str = _dumps(formatting_data or {})
     
-    conn.commit()
-    conn.close()
+    c.execute(_SQL_INSERT_NOTE, 
+            (title, content, updated_at, formatting_str))
+    note_id = c.lastrowid
+    _write_images(c, note_id, images_data or {})
+    return note_id
+
+def _now_ms():
+    # <- updated_at is stored as integer unix milliseconds ->
+    return int(time.time() * 1000)
+
+def save_note_to_db(title, content, images_data, formatting_data):
+    # <- The new note's id is returned so callers don't have to query for it ->
+    with _writer() as c:
+        return _insert_note(c, title, content, images_data, formatting_data, _now_ms())
 
 def update_note_in_db(note_id, title, content, images_data, formatting_data):
-    conn = sqlite3.connect(DATABASE)
-    c = conn.cursor()
+    # <- Formatting data coverting into JSON Strings, the images only live in note_images ->
+    formatting_str = _dumps(formatting_data or {})
     
-    # <- Images are being converted into JSON Strings ->
-    images_str = json.dumps(images_data) if images_data else "{}"
-    
-    # <- Formatting data coverting into JSON Strings ->
-    formatting_str = json.dumps(formatting_data) if formatting_data else "{}"
-    
-    c.execute('UPDATE notes SET title = ?, content = ?, updated_at = ?, images = ?, formatting = ? WHERE id = ?', 
-            (title, content, datetime.now(), images_str, formatting_str, note_id))
-    
-    conn.commit()
-    conn.close()
+    with _writer() as c:
+        c.execute(_SQL_UPDATE_NOTE, 
+                (title, content, _now_ms(), formatting_str, note_id))
+        _write_images(c, note_id, images_data or {})
 
 def get_notes_from_db():
-    conn = sqlite3.connect(DATABASE)
-    c = conn.cursor()
-    
-    c.execute('SELECT id, title FROM notes ORDER BY updated_at DESC')
-    
-    notes = c.fetchall()
-    conn.close()
-    return notes
+    with _reader() as c:
+        c.execute(_SQL_LIST_NOTES)
+        return c.fetchall()
 
 def get_recent_notes_from_db(limit=6):
-    conn = sqlite3.connect(DATABASE)
-    c = conn.cursor()
-    
-    c.execute('SELECT id, title, updated_at FROM notes ORDER BY updated_at DESC LIMIT ?', (limit,))
-    
-    notes = c.fetchall()
-    conn.close()
-    return notes
+    with _reader() as c:
+        c.execute(_SQL_RECENT_NOTES, (limit,))
+        return c.fetchall()
 
 def get_note_content(note_id):
-    conn = sqlite3.connect(DATABASE)
-    c = conn.cursor()
-    c.execute('SELECT title, content, images, formatting FROM notes WHERE id = ?', (note_id,))
-    note = c.fetchone()
-    conn.close()
-    return note
+    with _reader() as c:
+        c.execute(_SQL_GET_NOTE, (note_id,))
+        note = c.fetchone()
+        if not note:
+            return None
+        
+        c.execute(_SQL_GET_IMAGES, (note_id,))
+        images = {row['key']: row['blob'] for row in c}
+    
+    return (note['title'], note['content'], images, note['formatting'])
 
 def delete_note_from_db(note_id):
-    conn = sqlite3.connect(DATABASE)
-    c = conn.cursor()
-    c.execute('DELETE FROM notes WHERE id = ?', (note_id,))
-    conn.commit()
-    conn.close()
+    with _writer() as c:
+        c.execute(_SQL_DELETE_NOTE_IMAGES, (note_id,))
+        c.execute(_SQL_DELETE_NOTE, (note_id,))
+
+# <- Sizes offered in the toolbar, their font_ tags in the default family are configured ahead of use ->
+_FONT_SIZES = [8, 10, 12, 14, 16, 18, 20, 24]
+
+# <- Text tags for the combined styles and the font style each of them uses ->
+_FONT_SPECS = [
+    ("bold", "bold"),
+    ("italic", "italic"),
+    ("underline", "underline"),
+    ("bold-italic", "bold italic"),
+    ("bold-underline", "bold underline"),
+    ("italic-underline", "italic underline"),
+    ("bold-italic-underline", "bold italic underline"),
+]
+
+def _apply_palette(themed, palette):
+    # <- Recolors (widget, {option: color role}) pairs; the lookups are bound once outside the loop ->
+    color = palette.__getitem__
+    for widget, spec in themed:
+        widget.configure({option: color(role) for option, role in spec.items()})
+
+_FONT_FAMILIES = None
+
+def _get_font_families():
+    # <- Font enumeration goes to the window system, but the list does not change while the app is running ->
+    global _FONT_FAMILIES
+    if _FONT_FAMILIES is None:
+        _FONT_FAMILIES = sorted(font.families())
+    return _FONT_FAMILIES
+
+# <- PIL is imported the first time an image is handled, so starting the app does not pay for it ->
+Image = ImageTk = None
+
+def _require_pil():
+    global Image, ImageTk
+    if Image is None:
+        from PIL import Image, ImageTk
+
+# <- ImageGrab is only needed for pasting, so it is imported on the first paste ->
+ImageGrab = None
+
+def _require_image_grab():
+    global ImageGrab
+    _require_pil()
+    if ImageGrab is None:
+        from PIL import ImageGrab
+
+@lru_cache(maxsize=256)
+def _format_note_date(updated_ms):
+    # <- The recent note cards show the same few timestamps over and over ->
+    try:
+        return datetime.fromtimestamp(updated_ms / 1000).strftime('%b %d, %Y')
+    except (ValueError, TypeError, OverflowError, OSError):
+        # <- If the timestamp is missing or out of range, use a default ->
+        return "Unknown date"
+
+# <- Encoding pasted images, decoding a note's images and the recent notes query run on worker threads so the window does not freeze ->
+_IO_POOL = ThreadPoolExecutor(max_workers=2)
+
+def _encode_image(img):
+    # <- zlib level 1 is several times faster than the default level 6 and the files are only a little larger ->
+    buffer = io.BytesIO()
+    img.save(buffer, format="PNG", optimize=False, compress_level=1)
+    return buffer.getvalue()
+
+def _read_image_file(file_path):
+    # <- The whole file as bytes, they are both decoded for display and kept for saving ->
+    with open(file_path, "rb") as img_file:
+        return img_file.read()
+
+# <- Images are shown at most this wide in the editor ->
+_MAX_IMAGE_WIDTH = 500
+
+# <- In the saved content an image is the marker [IMAGE:id], in the text widget it is embedded under the name image_id ->
+_IMAGE_MARKER = "[IMAGE:{}]"
+_IMAGE_MARKER_START, _IMAGE_MARKER_END = _IMAGE_MARKER.split("{}")
+_IMAGE_MARKER_PATTERN = re.escape(_IMAGE_MARKER_START) + r"[^]]+" + re.escape(_IMAGE_MARKER_END)
+_IMAGE_MARKER_ID = slice(len(_IMAGE_MARKER_START), -len(_IMAGE_MARKER_END))
+_IMAGE_NAME = "image_{}"
+_IMAGE_NAME_PREFIX_LEN = len(_IMAGE_NAME.format(""))
+
+def _image_id(name):
+    # <- Tk adds "#n" to the name when the same image id is embedded more than once ->
+    return name.split("#")[0][_IMAGE_NAME_PREFIX_LEN:]
+
+def _fit_image(img, resample):
+    # <- Shared by inserting, pasting and loading; thumbnail works in place and does nothing for narrow images ->
+    if img.width > _MAX_IMAGE_WIDTH:
+        # <- JPEGs are decoded at a reduced DCT scale that is still at least 500px, other formats ignore draft ->
+        img.draft("RGB", (_MAX_IMAGE_WIDTH, _MAX_IMAGE_WIDTH))
+    # <- Images wider than 500px are shrunk to 500px wide, thumbnail keeps the aspect ratio ->
+    img.thumbnail((_MAX_IMAGE_WIDTH, img.height), resample)
+    return img
+
+def _decode_image(img_data):
+    # <- Decoding and downscaling happen on the worker, only the PhotoImage has to be made on the Tk thread ->
+    _require_pil()
+    # <- BICUBIC looks the same as LANCZOS at preview size and is cheaper ->
+    img = _fit_image(Image.open(io.BytesIO(img_data)), Image.BICUBIC)
+    img.load()
+    return img
 
 class NotesApp:
     def __init__(self, root):
@@ -196,9 +443,43 @@ class NotesApp:
         self.images_data = {}  
         self.image_counter = 0  
         self.formatting_data = {}  
-        self.open_notes = []  
+        self.open_notes_titles = {}  # note id -> title, in tab order
         self.active_tab = None  
         
+        # Ranges typed since the last formatting pass as (start mark, end mark), applied once typing pauses
+        # Marks move with the text, so edits made before the pass don't shift the ranges onto other characters
+        self._pending_format_ranges = []
+        self._format_mark_count = 0
+        self._modified_after = None
+        self._last_edit = 0
+        
+        # Images whose data is still being encoded, future -> (images dict, image id)
+        self._pending_images = {}
+        
+        # Bumped on every recent-notes refresh so only the newest query result is shown
+        self._recent_request = 0
+        
+        # Recent note cards are built once and refilled, the key is the data they currently show
+        self._recent_cards = []
+        self._last_recent_key = None
+        
+        # Pending step of the status bar animation
+        self._status_after_id = None
+        
+        # Pending write of changed font settings
+        self._settings_save_job = None
+        
+        # Pending relayout after a window resize and the window size it was last done for
+        self._resize_job = None
+        self._last_root_size = None
+        
+        # Bumped on every note load so images decoded for an earlier note are dropped
+        self._image_load = 0
+        self._image_placeholder = None
+        
+        # Images inserted or pasted so far, deleted images are dropped every few inserts
+        self._image_inserts = 0
+        
         self.current_format = {
             'bold': False,
             'italic': False,
@@ -207,6 +488,9 @@ class NotesApp:
             'font_family': self.settings['font_family']
         }
         
+        # False while typing would not get any formatting, so edits can skip the formatting pass
+        self._any_format_active = False
+        
         # <- color schemes for light and dark modes ->
         self.color_schemes = {
             'dark': {
@@ -252,6 +536,21 @@ class NotesApp:
         # Get current color scheme
         self.colors = self.color_schemes[self.theme]
         
+        # Widgets recolored on theme change, as (widget, {option: color role}) pairs
+        self._themed = []
+        self.tab_references = {}
+        self._tabs_width = 0
+        
+        # Named fonts keyed by (family, size, style)
+        self._font_cache = {}
+        
+        # (family, size) of each font_ tag, and the tag name per (family, size)
+        self._font_tags = {}
+        self._font_tag_cache = {}
+        
+        # (family, size) the combination style tags were last configured with
+        self._base_styles_font = None
+        
         # Menu Bar
         self.menu_bar = tk.Menu(root)
         self.root.config(menu=self.menu_bar)
@@ -265,7 +564,7 @@ class NotesApp:
         self.file_menu.add_command(label="Open", command=self.open_note_dialog)
         self.file_menu.add_command(label="Save", command=self.save_note)
         self.file_menu.add_separator()
-        self.file_menu.add_command(label="Exit", command=root.quit)
+        self.file_menu.add_command(label="Exit", command=self.on_close)
         
         # Edit Menu
         self.edit_menu = tk.Menu(self.menu_bar, tearoff=0, bg=self.colors['bg_secondary'], fg=self.colors['text_primary'],
@@ -291,6 +590,16 @@ class NotesApp:
         self.homepage_frame = tk.Frame(self.main_container, bg=self.colors['bg_primary'])
         self.editor_page_frame = tk.Frame(self.main_container, bg=self.colors['bg_primary'])
         
+        menu_colors = {'bg': 'bg_secondary', 'fg': 'text_primary', 'activebackground': 'bg_tertiary', 'activeforeground': 'text_primary'}
+        self._themed.extend([
+            (self.file_menu, menu_colors),
+            (self.edit_menu, menu_colors),
+            (self.view_menu, menu_colors),
+            (self.main_container, {'bg': 'bg_primary'}),
+            (self.homepage_frame, {'bg': 'bg_primary'}),
+            (self.editor_page_frame, {'bg': 'bg_primary'}),
+        ])
+        
         # Initialize both pages
         self.setup_homepage()
         self.setup_editor_page()
@@ -307,51 +616,59 @@ class NotesApp:
         # Bind window resize event
         self.root.bind("<Configure>", self.on_window_resize)
         
+        # Write pending settings before the window goes away
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        
         # Bind text insertion to maintain formatting
         self.text_area.bind("<<Modified>>", self.on_text_modified)
 
     def setup_homepage(self):
+        # Palette entries shared by the widgets below
+        bg_tertiary = self.colors['bg_tertiary']
+        text_primary = self.colors['text_primary']
+        bg_primary = self.colors['bg_primary']
+        
         # Header with app title and theme toggle
-        self.header_frame = tk.Frame(self.homepage_frame, bg=self.colors['bg_tertiary'], height=100)
+        self.header_frame = tk.Frame(self.homepage_frame, bg=bg_tertiary, height=100)
         self.header_frame.pack(fill="x")
         
         self.app_title = tk.Label(
             self.header_frame,
             text="Write It",
-            font=("Helvetica", 48, "bold"),
-            fg=self.colors['text_primary'],
-            bg=self.colors['bg_tertiary']
+            font=self._get_font("Helvetica", 48, "bold"),
+            fg=text_primary,
+            bg=bg_tertiary
         )
         self.app_title.place(relx=0.5, rely=0.5, anchor="center")
         
         # Welcome section - now with plain background
-        self.welcome_frame = tk.Frame(self.homepage_frame, bg=self.colors['bg_primary'], height=150)
+        self.welcome_frame = tk.Frame(self.homepage_frame, bg=bg_primary, height=150)
         self.welcome_frame.pack(fill="x", pady=20, padx=100)
         
         self.welcome_title = tk.Label(
             self.welcome_frame,
             text="Welcome to Write It Beta-2a",
-            font=("Helvetica", 24, "bold"),
-            fg=self.colors['text_primary'],
-            bg=self.colors['bg_primary']
+            font=self._get_font("Helvetica", 24, "bold"),
+            fg=text_primary,
+            bg=bg_primary
         )
         self.welcome_title.pack(pady=(20, 5))
 
         self.welcome_subtitle = tk.Label(
             self.welcome_frame,
             text="Your ideas, written simply. A beautiful note-taking experience.",
-            font=("Helvetica", 14),
-            fg=self.colors['text_primary'],
-            bg=self.colors['bg_primary']
+            font=self._get_font("Helvetica", 14),
+            fg=text_primary,
+            bg=bg_primary
         )
         self.welcome_subtitle.pack(pady=(0, 20))
 
         # Action buttons
-        self.action_center = tk.Frame(self.homepage_frame, bg=self.colors['bg_primary'])
+        self.action_center = tk.Frame(self.homepage_frame, bg=bg_primary)
         self.action_center.pack(pady=20, fill="x")
         
         # Create a container for centered buttons
-        self.button_container = tk.Frame(self.action_center, bg=self.colors['bg_primary'])
+        self.button_container = tk.Frame(self.action_center, bg=bg_primary)
         self.button_container.pack()
         
         # New note button
@@ -360,8 +677,8 @@ class NotesApp:
             text="Create New Note",
             command=self.new_note,
             bg=self.colors['button_primary'],
-            fg=self.colors['text_primary'],
-            font=("Helvetica", 12),
+            fg=text_primary,
+            font=self._get_font("Helvetica", 12),
             relief="flat",
             padx=20,
             pady=10
@@ -374,8 +691,8 @@ class NotesApp:
             text="View All Notes",
             command=self.open_note_dialog,
             bg=self.colors['button_secondary'],
-            fg=self.colors['text_primary'],
-            font=("Helvetica", 12),
+            fg=text_primary,
+            font=self._get_font("Helvetica", 12),
             relief="flat",
             padx=20,
             pady=10
@@ -383,53 +700,83 @@ class NotesApp:
         self.open_note_btn.pack(side="left", padx=20)
 
         # Recent Notes section
-        self.recent_title_frame = tk.Frame(self.homepage_frame, bg=self.colors['bg_primary'])
+        self.recent_title_frame = tk.Frame(self.homepage_frame, bg=bg_primary)
         self.recent_title_frame.pack(fill="x", pady=(40, 10))
         
         self.recent_title = tk.Label(
             self.recent_title_frame,
             text="Recent Notes",
-            font=("Helvetica", 22, "bold"),
-            fg=self.colors['text_primary'],
-            bg=self.colors['bg_primary']
+            font=self._get_font("Helvetica", 22, "bold"),
+            fg=text_primary,
+            bg=bg_primary
         )
         self.recent_title.pack()
         
         # Recent notes container
-        self.recent_frame = tk.Frame(self.homepage_frame, bg=self.colors['bg_primary'])
+        self.recent_frame = tk.Frame(self.homepage_frame, bg=bg_primary)
         self.recent_frame.pack(fill="both", expand=True, padx=30, pady=10)
 
-        self.recent_grid = tk.Frame(self.recent_frame, bg=self.colors['bg_primary'])
+        self.recent_grid = tk.Frame(self.recent_frame, bg=bg_primary)
         self.recent_grid.pack(fill="both", expand=True)
+        
+        # Configure grid weights for responsiveness
+        for i in range(3):
+            self.recent_grid.columnconfigure(i, weight=1)
+        for i in range(2):
+            self.recent_grid.rowconfigure(i, weight=1)
 
         # Status bar
-        self.status_frame = tk.Frame(self.homepage_frame, bg=self.colors['bg_tertiary'], height=30)
+        self.status_frame = tk.Frame(self.homepage_frame, bg=bg_tertiary, height=30)
         self.status_frame.pack(fill="x", side="bottom")
         
         self.home_status_bar = tk.Label(
             self.status_frame,
             text="Ready",
-            font=("Helvetica", 10),
-            fg=self.colors['text_primary'],
-            bg=self.colors['bg_tertiary'],
+            font=self._get_font("Helvetica", 10),
+            fg=text_primary,
+            bg=bg_tertiary,
             anchor="w",
             padx=10
         )
         self.home_status_bar.pack(side="left")
 
+        self._themed.extend([
+            (self.header_frame, {'bg': 'bg_tertiary'}),
+            (self.app_title, {'fg': 'text_primary', 'bg': 'bg_tertiary'}),
+            (self.welcome_frame, {'bg': 'bg_primary'}),
+            (self.welcome_title, {'fg': 'text_primary', 'bg': 'bg_primary'}),
+            (self.welcome_subtitle, {'fg': 'text_primary', 'bg': 'bg_primary'}),
+            (self.action_center, {'bg': 'bg_primary'}),
+            (self.button_container, {'bg': 'bg_primary'}),
+            (self.new_note_btn, {'bg': 'button_primary', 'fg': 'text_primary'}),
+            (self.open_note_btn, {'bg': 'button_secondary', 'fg': 'text_primary'}),
+            (self.recent_title_frame, {'bg': 'bg_primary'}),
+            (self.recent_title, {'fg': 'text_primary', 'bg': 'bg_primary'}),
+            (self.recent_frame, {'bg': 'bg_primary'}),
+            (self.recent_grid, {'bg': 'bg_primary'}),
+            (self.status_frame, {'bg': 'bg_tertiary'}),
+            (self.home_status_bar, {'fg': 'text_primary', 'bg': 'bg_tertiary'}),
+        ])
+
         self.update_recent_notes()
 
     def setup_editor_page(self):
+        # Palette entries shared by the widgets below
+        bg_tertiary = self.colors['bg_tertiary']
+        text_primary = self.colors['text_primary']
+        button_secondary = self.colors['button_secondary']
+        bg_primary = self.colors['bg_primary']
+        
         # Header with app title and navigation
-        self.editor_header_frame = tk.Frame(self.editor_page_frame, bg=self.colors['bg_tertiary'], height=60)
+        self.editor_header_frame = tk.Frame(self.editor_page_frame, bg=bg_tertiary, height=60)
         self.editor_header_frame.pack(fill="x")
         
         self.editor_app_title = tk.Label(
             self.editor_header_frame, 
             text="Write It", 
-            font=("Helvetica", 20, "bold"),
-            fg=self.colors['text_primary'],
-            bg=self.colors['bg_tertiary']
+            font=self._get_font("Helvetica", 20, "bold"),
+            fg=text_primary,
+            bg=bg_tertiary
         )
         self.editor_app_title.place(x=20, rely=0.5, anchor="w")
         
@@ -438,9 +785,9 @@ class NotesApp:
             self.editor_header_frame,
             text="🌙" if self.theme == 'light' else "☀️",
             command=self.toggle_theme,
-            font=("Helvetica", 12),
-            bg=self.colors['bg_tertiary'],
-            fg=self.colors['text_primary'],
+            font=self._get_font("Helvetica", 12),
+            bg=bg_tertiary,
+            fg=text_primary,
             relief="flat",
             bd=0,
             padx=10,
@@ -453,9 +800,9 @@ class NotesApp:
             self.editor_header_frame,
             text="Back to Home",
             command=self.show_homepage,
-            bg=self.colors['button_secondary'],
-            fg=self.colors['text_primary'],
-            font=("Helvetica", 10),
+            bg=button_secondary,
+            fg=text_primary,
+            font=self._get_font("Helvetica", 10),
             relief="flat",
             padx=10,
             pady=5
@@ -463,19 +810,23 @@ class NotesApp:
         self.home_button.place(relx=0.85, rely=0.5, anchor="e")
 
         # Tab bar for open notes - with minimal styling
-        self.tab_frame = tk.Frame(self.editor_page_frame, bg=self.colors['bg_primary'], height=40)
+        self.tab_frame = tk.Frame(self.editor_page_frame, bg=bg_primary, height=40)
         self.tab_frame.pack(fill="x")
         
         # Create a canvas for the tab bar with horizontal scrolling
-        self.tab_canvas = tk.Canvas(self.tab_frame, height=40, bg=self.colors['bg_primary'], highlightthickness=0)
+        self.tab_canvas = tk.Canvas(self.tab_frame, height=40, bg=bg_primary, highlightthickness=0)
         self.tab_canvas.pack(fill="x", side="top")
         
         # Create a frame inside the canvas for the tabs
         self.tabs_container = ttk.Frame(self.tab_canvas)
         # Create a style for the tabs container instead of directly setting background
-        self.style.configure('TabsContainer.TFrame', background=self.colors['bg_primary'])
+        self.style.configure('TabsContainer.TFrame', background=bg_primary)
         self.tabs_container.configure(style='TabsContainer.TFrame')
-        self.tab_canvas.create_window((0, 0), window=self.tabs_container, anchor="nw")
+        self._tab_window_id = self.tab_canvas.create_window((0, 0), window=self.tabs_container, anchor="nw")
+        
+        # Last canvas width laid out for, and the pending layout job of a resize burst
+        self._last_canvas_width = -1
+        self._canvas_layout_after = None
         
         # Configure scrolling for the tab bar
         self.tab_scrollbar = ttk.Scrollbar(self.tab_frame, orient="horizontal", command=self.tab_canvas.xview)
@@ -483,7 +834,6 @@ class NotesApp:
         self.tab_canvas.configure(xscrollcommand=self.tab_scrollbar.set)
         
         # Bind events for scrolling
-        self.tabs_container.bind("<Configure>", lambda e: self.tab_canvas.configure(scrollregion=self.tab_canvas.bbox("all")))
         self.tab_canvas.bind("<Configure>", self.on_tab_canvas_configure)
         
         # Bind mouse wheel for horizontal scrolling
@@ -492,7 +842,7 @@ class NotesApp:
         # Toolbar - with frame
         self.toolbar_frame = tk.Frame(
             self.editor_page_frame, 
-            bg=self.colors['bg_tertiary'], 
+            bg=bg_tertiary, 
             height=40,
             bd=1,
             relief="raised"
@@ -500,8 +850,8 @@ class NotesApp:
         self.toolbar_frame.pack(fill="x")
         
         # Formatting buttons
-        btn_bg = self.colors['button_secondary']
-        btn_fg = self.colors['text_primary']
+        btn_bg = button_secondary
+        btn_fg = text_primary
         btn_width = 3
         
         self.bold_button = tk.Button(
@@ -510,7 +860,7 @@ class NotesApp:
             command=self.toggle_bold, 
             bg=btn_bg,
             fg=btn_fg,
-            font=("Helvetica", 10, "bold"),
+            font=self._get_font("Helvetica", 10, "bold"),
             relief="flat",
             width=btn_width
         )
@@ -522,7 +872,7 @@ class NotesApp:
             command=self.toggle_italic, 
             bg=btn_bg,
             fg=btn_fg,
-            font=("Helvetica", 10, "italic"),
+            font=self._get_font("Helvetica", 10, "italic"),
             relief="flat",
             width=btn_width
         )
@@ -534,12 +884,19 @@ class NotesApp:
             command=self.toggle_underline, 
             bg=btn_bg,
             fg=btn_fg,
-            font=("Helvetica", 10, "underline"),
+            font=self._get_font("Helvetica", 10, "underline"),
             relief="flat",
             width=btn_width
         )
         self.underline_button.place(x=100, rely=0.5, anchor="w")
         
+        # Format buttons by the current_format key they toggle
+        self._format_buttons = {
+            'bold': self.bold_button,
+            'italic': self.italic_button,
+            'underline': self.underline_button
+        }
+        
         # Image button
         self.image_button = tk.Button(
             self.toolbar_frame,
@@ -547,7 +904,7 @@ class NotesApp:
             command=self.insert_image,
             bg=btn_bg,
             fg=btn_fg,
-            font=("Helvetica", 10),
+            font=self._get_font("Helvetica", 10),
             relief="flat",
             padx=10
         )
@@ -557,15 +914,15 @@ class NotesApp:
         self.font_size_label = tk.Label(
             self.toolbar_frame, 
             text="Size:", 
-            fg=self.colors['text_primary'],
-            bg=self.colors['bg_tertiary'],
-            font=("Helvetica", 10)
+            fg=text_primary,
+            bg=bg_tertiary,
+            font=self._get_font("Helvetica", 10)
         )
         self.font_size_label.place(x=220, rely=0.5, anchor="w")
 
         self.font_size_combo = ttk.Combobox(
             self.toolbar_frame, 
-            values=[8, 10, 12, 14, 16, 18, 20, 24], 
+            values=_FONT_SIZES, 
             width=5
         )
         self.font_size_combo.set(self.current_format['font_size'])
@@ -577,14 +934,14 @@ class NotesApp:
         self.font_family_label = tk.Label(
             self.toolbar_frame, 
             text="Font:", 
-            fg=self.colors['text_primary'],
-            bg=self.colors['bg_tertiary'],
-            font=("Helvetica", 10)
+            fg=text_primary,
+            bg=bg_tertiary,
+            font=self._get_font("Helvetica", 10)
         )
         self.font_family_label.place(x=320, rely=0.5, anchor="w")
 
         # Get available system fonts
-        available_fonts = sorted(list(font.families()))
+        available_fonts = _get_font_families()
         self.font_family_combo = ttk.Combobox(
             self.toolbar_frame, 
             values=available_fonts,
@@ -602,8 +959,8 @@ class NotesApp:
             text="Delete Note", 
             command=self.delete_note, 
             bg=self.colors['danger'],
-            fg=self.colors['text_primary'],
-            font=("Helvetica", 10),
+            fg=text_primary,
+            font=self._get_font("Helvetica", 10),
             relief="flat",
             padx=10
         )
@@ -614,8 +971,8 @@ class NotesApp:
             text="Save Note", 
             command=self.save_note, 
             bg=self.colors['success'],
-            fg=self.colors['text_primary'],
-            font=("Helvetica", 10),
+            fg=text_primary,
+            font=self._get_font("Helvetica", 10),
             relief="flat",
             padx=10
         )
@@ -626,31 +983,31 @@ class NotesApp:
             text="New Note", 
             command=self.new_note, 
             bg=self.colors['info'],
-            fg=self.colors['text_primary'],
-            font=("Helvetica", 10),
+            fg=text_primary,
+            font=self._get_font("Helvetica", 10),
             relief="flat",
             padx=10
         )
         self.new_button.place(relx=0.78, rely=0.5, anchor="e")
 
         # Content area with editor - plain background
-        self.content_container = tk.Frame(self.editor_page_frame, bg=self.colors['bg_primary'])
+        self.content_container = tk.Frame(self.editor_page_frame, bg=bg_primary)
         self.content_container.pack(fill="both", expand=True, pady=(10, 0))
 
         # Text Area
-        self.text_frame = tk.Frame(self.content_container, bg=self.colors['bg_primary'])
+        self.text_frame = tk.Frame(self.content_container, bg=bg_primary)
         self.text_frame.pack(fill="both", expand=True)
         
         self.text_area = tk.Text(
             self.text_frame, 
-            font=(self.current_format['font_family'], self.current_format['font_size']), 
+            font=self._get_font(self.current_format['font_family'], self.current_format['font_size']), 
             wrap="none",  # Changed to none for horizontal scrolling
             undo=True,
             bg=self.colors['editor_bg'],
             fg=self.colors['editor_text'],
             insertbackground=self.colors['text_accent'],  # cursor color
-            selectbackground=self.colors['bg_tertiary'],
-            selectforeground=self.colors['text_primary'],
+            selectbackground=bg_tertiary,
+            selectforeground=text_primary,
             padx=15,
             pady=15,
             relief="flat",
@@ -663,7 +1020,6 @@ class NotesApp:
             self.text_area, 
             command=self.text_area.yview
         )
-        self.text_area.config(yscrollcommand=self.text_v_scrollbar.set)
         self.text_v_scrollbar.pack(side="right", fill="y")
         
         # Add horizontal scrollbar to text area
@@ -672,28 +1028,33 @@ class NotesApp:
             orient="horizontal",
             command=self.text_area.xview
         )
-        self.text_area.config(xscrollcommand=self.text_h_scrollbar.set)
         self.text_h_scrollbar.pack(side="bottom", fill="x")
         
+        # Hook both scrollbars up in one reconfigure of the text widget
+        self.text_area.configure(
+            yscrollcommand=self.text_v_scrollbar.set,
+            xscrollcommand=self.text_h_scrollbar.set
+        )
+        
+        # Bound once so the formatting paths don't look the method up per range
+        self._tk_call = self.text_area.tk.call
+        
         # Configure text tags for formatting
-        self.text_area.tag_configure("bold", font=(self.current_format['font_family'], self.current_format['font_size'], "bold"))
-        self.text_area.tag_configure("italic", font=(self.current_format['font_family'], self.current_format['font_size'], "italic"))
-        self.text_area.tag_configure("underline", font=(self.current_format['font_family'], self.current_format['font_size'], "underline"))
-        self.text_area.tag_configure("bold-italic", font=(self.current_format['font_family'], self.current_format['font_size'], "bold italic"))
-        self.text_area.tag_configure("bold-underline", font=(self.current_format['font_family'], self.current_format['font_size'], "bold underline"))
-        self.text_area.tag_configure("italic-underline", font=(self.current_format['font_family'], self.current_format['font_size'], "italic underline"))
-        self.text_area.tag_configure("bold-italic-underline", font=(self.current_format['font_family'], self.current_format['font_size'], "bold italic underline"))
+        self._reconfigure_base_styles(self.current_format['font_family'], self.current_format['font_size'])
+        
+        # Configure the size tags of the toolbar sizes once the window is up, so applying a size is only a tag add
+        self.root.after_idle(self._preconfigure_size_tags)
 
         # Status bar
-        self.editor_status_frame = tk.Frame(self.editor_page_frame, bg=self.colors['bg_tertiary'], height=30)
+        self.editor_status_frame = tk.Frame(self.editor_page_frame, bg=bg_tertiary, height=30)
         self.editor_status_frame.pack(fill="x", side="bottom")
         
         self.editor_status_bar = tk.Label(
             self.editor_status_frame,
             text="Ready",
-            font=("Helvetica", 10),
-            fg=self.colors['text_primary'],
-            bg=self.colors['bg_tertiary'],
+            font=self._get_font("Helvetica", 10),
+            fg=text_primary,
+            bg=bg_tertiary,
             anchor="w",
             padx=10
         )
@@ -703,14 +1064,76 @@ class NotesApp:
         self.shortcut_info = tk.Label(
             self.editor_status_frame,
             text="Shortcuts: Ctrl+B (Bold) | Ctrl+I (Italic) | Ctrl+U (Underline)",
-            font=("Helvetica", 9),
+            font=self._get_font("Helvetica", 9),
             fg=self.colors['text_secondary'],
-            bg=self.colors['bg_tertiary'],
+            bg=bg_tertiary,
             anchor="e",
             padx=10
         )
         self.shortcut_info.pack(side="right")
 
+        # The bold/italic/underline backgrounds follow the formatting state, see toggle_theme
+        self._themed.extend([
+            (self.editor_header_frame, {'bg': 'bg_tertiary'}),
+            (self.editor_app_title, {'fg': 'text_primary', 'bg': 'bg_tertiary'}),
+            (self.editor_theme_toggle, {'bg': 'bg_tertiary', 'fg': 'text_primary'}),
+            (self.home_button, {'bg': 'button_secondary', 'fg': 'text_primary'}),
+            (self.tab_frame, {'bg': 'bg_primary'}),
+            (self.tab_canvas, {'bg': 'bg_primary'}),
+            (self.toolbar_frame, {'bg': 'bg_tertiary'}),
+            (self.bold_button, {'fg': 'text_primary'}),
+            (self.italic_button, {'fg': 'text_primary'}),
+            (self.underline_button, {'fg': 'text_primary'}),
+            (self.image_button, {'bg': 'button_secondary', 'fg': 'text_primary'}),
+            (self.font_size_label, {'fg': 'text_primary', 'bg': 'bg_tertiary'}),
+            (self.font_family_label, {'fg': 'text_primary', 'bg': 'bg_tertiary'}),
+            (self.delete_button, {'bg': 'danger', 'fg': 'text_primary'}),
+            (self.save_button, {'bg': 'success', 'fg': 'text_primary'}),
+            (self.new_button, {'bg': 'info', 'fg': 'text_primary'}),
+            (self.content_container, {'bg': 'bg_primary'}),
+            (self.text_frame, {'bg': 'bg_primary'}),
+            (self.text_area, {
+                'bg': 'editor_bg',
+                'fg': 'editor_text',
+                'insertbackground': 'text_accent',
+                'selectbackground': 'bg_tertiary',
+                'selectforeground': 'text_primary'
+            }),
+            (self.editor_status_frame, {'bg': 'bg_tertiary'}),
+            (self.editor_status_bar, {'fg': 'text_primary', 'bg': 'bg_tertiary'}),
+            (self.shortcut_info, {'fg': 'text_secondary', 'bg': 'bg_tertiary'}),
+        ])
+
+    @property
+    def open_notes(self):
+        # (note id, title) pairs of the open tabs in tab order
+        return list(self.open_notes_titles.items())
+
+    def _reconfigure_base_styles(self, family, size):
+        # The bold/italic/underline combination tags all sit on the default font, so only a new default redoes them
+        if self._base_styles_font == (family, size):
+            return
+        self._base_styles_font = (family, size)
+        tag_configure = self.text_area.tag_configure
+        for tag, style in _FONT_SPECS:
+            tag_configure(tag, font=self._get_font(family, size, style))
+
+    def _get_font(self, family, size, style=""):
+        # Reuse one named font per (family, size, style) instead of building a new one per tag
+        key = (family, size, style)
+        named_font = self._font_cache.get(key)
+        if named_font is None:
+            words = style.split()
+            named_font = font.Font(
+                family=family,
+                size=size,
+                weight="bold" if "bold" in words else "normal",
+                slant="italic" if "italic" in words else "roman",
+                underline="underline" in words
+            )
+            self._font_cache[key] = named_font
+        return named_font
+
     def toggle_theme(self):
         # Toggle theme
         self.theme = 'light' if self.theme == 'dark' else 'dark'
@@ -725,101 +1148,193 @@ class NotesApp:
         # Update style
         self.style.theme_use("darkly" if self.theme == 'dark' else "flatly")
         
-        # Update theme toggle buttons
-        self.theme_toggle_btn.configure(text="🌙" if self.theme == 'light' else "☀️")
-        self.editor_theme_toggle.configure(text="🌙" if self.theme == 'light' else "☀️")
+        # Update the ttk styles used by the tab bar
+        self.style.configure('TabsContainer.TFrame', background=self.colors['bg_primary'])
+        self.style.configure('TabFrame.TFrame', background=self.colors['bg_primary'])
         
-        # Recreate the UI with new colors
-        # First, save the current state
-        current_page = "homepage" if self.homepage_frame.winfo_ismapped() else "editor"
+        # Update theme toggle button
+        self.editor_theme_toggle.configure(text="🌙" if self.theme == 'light' else "☀️")
         
-        # Clear existing frames
-        for widget in self.homepage_frame.winfo_children():
-            widget.destroy()
-        for widget in self.editor_page_frame.winfo_children():
-            widget.destroy()
+        # Recolor the existing widgets in place instead of rebuilding the UI
+        _apply_palette(self._themed, self.colors)
         
-        # Recreate the UI
-        self.setup_homepage()
-        self.setup_editor_page()
+        # Formatting buttons and tabs are colored by their current state
+        for key, button in self._format_buttons.items():
+            button.configure(bg=self.colors['button_primary' if self.current_format[key] else 'button_secondary'])
         
-        # Restore the current state
-        if current_page == "homepage":
-            self.show_homepage()
-        else:
-            self.show_editor_page()
-            
-            # Restore open tabs
-            for note_id, title in self.open_notes:
-                self.add_tab(note_id, title)
-            
-            # Restore active tab
-            if self.active_tab is not None:
-                self.activate_tab(self.active_tab)
-        
-        # Update text area colors
-        self.text_area.configure(
-            bg=self.colors['editor_bg'],
-            fg=self.colors['editor_text'],
-            insertbackground=self.colors['text_accent'],
-            selectbackground=self.colors['bg_tertiary'],
-            selectforeground=self.colors['text_primary']
-        )
+        for note_id, refs in self.tab_references.items():
+            tab_bg = self.colors['tab_active' if note_id == self.active_tab else 'tab_inactive']
+            refs['button'].configure(bg=tab_bg, fg=self.colors['text_primary'])
+            refs['close'].configure(bg=tab_bg, fg=self.colors['text_primary'])
         
         # Show animation
         self.animate_status_bar(f"Theme changed to {self.theme} mode")
 
     def on_text_modified(self, event=None):
-        if not self.text_area.edit_modified():
+        text_area = self.text_area
+        if not text_area.edit_modified():
             return
 
-        # Reset the modified flag
-        self.text_area.edit_modified(False)
+        # Reset the modified flag so the next edit fires the event again
+        text_area.edit_modified(False)
+        
+        # Plain typing needs no formatting pass
+        if not self._any_format_active:
+            return
+
+        # Remember the most recently inserted character(s)
+        insert_pos = text_area.index(tk.INSERT)
+        line, column = insert_pos.split(".")
+        if column != "0":
+            # One character back on the same line needs no round trip to Tk
+            start_pos = f"{line}.{int(column) - 1}"
+        else:
+            # index() works out the end of the previous line and clamps to 1.0
+            start_pos = text_area.index(f"{insert_pos}-1c")
+        if start_pos != insert_pos:
+            pending = self._pending_format_ranges
+            # Typing straight on from the last range is already covered, its right-gravity end mark moved past the new text
+            if not pending or text_area.index(pending[-1][1]) != insert_pos:
+                call, widget = self._tk_call, text_area._w
+                self._format_mark_count += 1
+                start_mark = f"format_start_{self._format_mark_count}"
+                end_mark = f"format_end_{self._format_mark_count}"
+                # The start mark stays left of text inserted at it, the end mark (right gravity by default) moves past it
+                call(widget, 'mark', 'set', start_mark, start_pos)
+                call(widget, 'mark', 'gravity', start_mark, 'left')
+                call(widget, 'mark', 'set', end_mark, insert_pos)
+                pending.append((start_mark, end_mark))
+
+        # Format once typing pauses instead of on every keystroke, the timer is set once per pause
+        self._last_edit = time.monotonic()
+        if not self._modified_after:
+            self._modified_after = self.root.after(150, self._format_timer)
+
+    def _format_timer(self):
+        # Typing went on after the timer was set, wait out the rest of the pause
+        remaining = int((self._last_edit + 0.15 - time.monotonic()) * 1000)
+        if remaining > 0:
+            self._modified_after = self.root.after(remaining, self._format_timer)
+        else:
+            self._do_modified()
+
+    def _update_format_active(self):
+        current_format = self.current_format
+        self._any_format_active = (
+            current_format['bold'] or current_format['italic'] or current_format['underline']
+            or current_format['font_size'] != self.settings['font_size']
+            or current_format['font_family'] != self.settings['font_family']
+        )
+
+    def _do_modified(self):
+        # Also called directly to apply pending formatting before the format state changes
+        if self._modified_after:
+            self.root.after_cancel(self._modified_after)
+            self._modified_after = None
 
-        # Apply formatting to the most recently inserted character(s)
-        insert_pos = self.text_area.index(tk.INSERT)
-        start_pos = self.text_area.index(f"{insert_pos}-1c")
-        if self.text_area.compare(start_pos, "<", "1.0"):
-            start_pos = "1.0"
-        if self.text_area.compare(start_pos, "<", insert_pos):
-            self.apply_current_formatting(start_pos, insert_pos)
+        ranges = self._pending_format_ranges
+        if not ranges:
+            return
+        self._pending_format_ranges = []
+        apply_formatting = self.apply_current_formatting
+        for start_mark, end_mark in ranges:
+            apply_formatting(start_mark, end_mark)
+        self._unset_format_marks(ranges)
+
+    def _unset_format_marks(self, ranges):
+        # All marks of the pass go in one "mark unset" call
+        self._tk_call(self.text_area._w, 'mark', 'unset', *[mark for marks in ranges for mark in marks])
+
+    def _drop_pending_format(self):
+        # The text is about to be replaced, marks left in it would stretch over the new content
+        if self._modified_after:
+            self.root.after_cancel(self._modified_after)
+            self._modified_after = None
+        if self._pending_format_ranges:
+            self._unset_format_marks(self._pending_format_ranges)
+            self._pending_format_ranges = []
 
     def apply_current_formatting(self, start_pos, end_pos):
-        # Apply bold formatting if active
-        if self.current_format['bold']:
-            self.text_area.tag_add("bold", start_pos, end_pos)
-
-        # Apply italic formatting if active
-        if self.current_format['italic']:
-            self.text_area.tag_add("italic", start_pos, end_pos)
-
-        # Apply underline formatting if active
-        if self.current_format['underline']:
-            self.text_area.tag_add("underline", start_pos, end_pos)
-
-        # Apply font size if different from default
-        if self.current_format['font_size'] != self.settings['font_size']:
-            tag_name = f"size_{self.current_format['font_size']}"
-            self.text_area.tag_configure(
-                tag_name,
-                font=(self.current_format['font_family'], self.current_format['font_size'])
-            )
-            self.text_area.tag_add(tag_name, start_pos, end_pos)
-
-        # Apply font family if different from default
-        if self.current_format['font_family'] != self.settings['font_family']:
-            tag_name = f"family_{self.current_format['font_family']}"
-            self.text_area.tag_configure(
-                tag_name,
-                font=(self.current_format['font_family'], self.current_format['font_size'])
-            )
-            self.text_area.tag_add(tag_name, start_pos, end_pos)
+        current_format = self.current_format
+        
+        # Bold, italic and underline if active
+        styles = [key for key in ("bold", "italic", "underline") if current_format[key]]
+
+        # Font if its family or size is different from default, one tag carries both
+        if (current_format['font_size'] != self.settings['font_size']
+                or current_format['font_family'] != self.settings['font_family']):
+            styles.append(self._font_tag(current_format['font_family'], current_format['font_size']))
+        
+        self._apply_styles(start_pos, end_pos, styles)
+
+    def _apply_styles(self, start_pos, end_pos, styles):
+        # Every active tag goes straight to Tcl's "tag add", skipping the argument handling of the tkinter wrapper
+        call, widget = self._tk_call, self.text_area._w
+        for tag_name in styles:
+            call(widget, 'tag', 'add', tag_name, start_pos, end_pos)
+
+    def _tag_add_ranges(self, tag_name, ranges):
+        # Tk's "tag add" takes any number of index pairs, so all ranges of a tag go over in one call
+        indices = [index for start_end in ranges for index in start_end]
+        if indices:
+            self.text_area.tk.call(self.text_area._w, 'tag', 'add', tag_name, *indices)
+
+    def _font_tag(self, family, size):
+        # Tk takes the whole font from one tag, so a font_ tag carries both the family and the size
+        # Each pair is configured once, Tk re-measures the font on every tag_configure
+        tag_name = self._font_tag_cache.get((family, size))
+        if tag_name is None:
+            tag_name = self._font_tag_cache[(family, size)] = f"font_{family}_{size}"
+            self.text_area.tag_configure(tag_name, font=self._get_font(family, size))
+            self._font_tags[tag_name] = (family, size)
+        return tag_name
+
+    def _font_tags_in(self, start, end):
+        # ((family, size) shown at start, the font tags on the range), from one tag_names and one dump
+        # The tags on the range are those on at start and those that begin inside it, not every tag ever made
+        font_tags = self._font_tags
+        at_start = [tag_name for tag_name in self.text_area.tag_names(start) if tag_name in font_tags]
+        present = set(at_start)
+        present.update(tag_name for key, tag_name, index in self.text_area.dump(start, end, tag=True)
+                       if key == "tagon" and tag_name in font_tags)
+        
+        # tag_names lists the highest priority tag last, that is the font that shows
+        if at_start:
+            return font_tags[at_start[-1]], present
+        return (self.settings['font_family'], self.settings['font_size']), present
+
+    def _preconfigure_size_tags(self):
+        # Only the toolbar sizes in the default family, one tag per installed family would be hundreds of fonts
+        for size in _FONT_SIZES:
+            self._font_tag(self.settings['font_family'], size)
+
+    def _update_tab_scrollregion(self):
+        # The width of the open tabs is tracked as they open and close, so Tk does not have to measure every tab
+        self.tab_canvas.configure(scrollregion=(0, 0, self._tabs_width, 40))
+
+    def _set_tab_width(self, note_id):
+        refs = self.tab_references[note_id]
+        width = refs['button'].winfo_reqwidth() + refs['close'].winfo_reqwidth() + 4  # frame padx on both sides
+        self._tabs_width += width - refs.get('width', 0)
+        refs['width'] = width
 
     def on_tab_canvas_configure(self, event):
+        # Configure also fires for moves and scrolls, only a new width needs a layout
+        if event.width == self._last_canvas_width:
+            return
+        self._last_canvas_width = event.width
+        
+        # Lay out once the resize settles instead of on every event of it
+        if self._canvas_layout_after:
+            self.root.after_cancel(self._canvas_layout_after)
+        self._canvas_layout_after = self.root.after(16, self._do_canvas_layout)
+
+    def _do_canvas_layout(self):
+        self._canvas_layout_after = None
         # Update the scrollregion to encompass the inner frame
-        self.tab_canvas.configure(scrollregion=self.tab_canvas.bbox("all"))
+        self._update_tab_scrollregion()
         # Set the canvas width to match the window width
-        self.tab_canvas.itemconfig(self.tab_canvas.find_withtag("all")[0], width=event.width)
+        self.tab_canvas.itemconfig(self._tab_window_id, width=self._last_canvas_width)
 
     def on_mousewheel(self, event):
         # Scroll horizontally with the mouse wheel
@@ -827,11 +1342,13 @@ class NotesApp:
 
     def add_tab(self, note_id, title):
         # Check if tab already exists
-        for tab_id, tab_title in self.open_notes:
-            if tab_id == note_id:
-                # Tab already exists, just activate it
-                self.activate_tab(note_id)
-                return
+        if note_id in self.open_notes_titles:
+            # Tab already exists, just activate it
+            self.activate_tab(note_id)
+            return
+        
+        tab_inactive = self.colors['tab_inactive']
+        text_primary = self.colors['text_primary']
         
         # Create a new tab
         tab_frame = ttk.Frame(self.tabs_container)
@@ -841,15 +1358,15 @@ class NotesApp:
         tab_frame.pack(side="left", padx=2, pady=2)
         
         # Add tab to the list of open notes
-        self.open_notes.append((note_id, title))
+        self.open_notes_titles[note_id] = title
         
         # Create tab button with title and close button
         tab_button = tk.Button(
             tab_frame,
             text=title,
-            bg=self.colors['tab_inactive'],
-            fg=self.colors['text_primary'],
-            font=("Helvetica", 10),
+            bg=tab_inactive,
+            fg=text_primary,
+            font=self._get_font("Helvetica", 10),
             relief="flat",
             padx=10,
             command=lambda id=note_id: self.activate_tab(id)
@@ -859,9 +1376,9 @@ class NotesApp:
         close_button = tk.Button(
             tab_frame,
             text="×",
-            bg=self.colors['tab_inactive'],
-            fg=self.colors['text_primary'],
-            font=("Helvetica", 10, "bold"),
+            bg=tab_inactive,
+            fg=text_primary,
+            font=self._get_font("Helvetica", 10, "bold"),
             relief="flat",
             padx=5,
             command=lambda id=note_id: self.close_tab(id)
@@ -869,31 +1386,53 @@ class NotesApp:
         close_button.pack(side="left", padx=0)
         
         # Store references to the tab components
-        if not hasattr(self, 'tab_references'):
-            self.tab_references = {}
-        
         self.tab_references[note_id] = {
             'frame': tab_frame,
             'button': tab_button,
             'close': close_button
         }
+        self._set_tab_width(note_id)
         
         # Activate the new tab
         self.activate_tab(note_id)
         
         # Update the tab canvas scrollregion
-        self.tab_canvas.configure(scrollregion=self.tab_canvas.bbox("all"))
+        self._update_tab_scrollregion()
+
+    def _rename_tab(self, old_id, new_id, title):
+        # Retitle and re-key a tab in place instead of destroying and rebuilding its widgets
+        refs = self.tab_references.pop(old_id)
+        self.tab_references[new_id] = refs
+        refs['button'].configure(text=title, command=lambda id=new_id: self.activate_tab(id))
+        refs['close'].configure(command=lambda id=new_id: self.close_tab(id))
+        
+        # Only the tab's own width changes
+        self._set_tab_width(new_id)
+        self._update_tab_scrollregion()
+        
+        # Update in open notes, keeping the tab order
+        if new_id == old_id:
+            self.open_notes_titles[new_id] = title
+        else:
+            self.open_notes_titles = {(new_id if id == old_id else id): (title if id == old_id else t)
+                                      for id, t in self.open_notes_titles.items()}
+        if self.active_tab == old_id:
+            self.active_tab = new_id
 
     def activate_tab(self, note_id):
         # Deactivate current tab if any
         if self.active_tab is not None and self.active_tab in self.tab_references:
-            self.tab_references[self.active_tab]['button'].configure(bg=self.colors['tab_inactive'])
-            self.tab_references[self.active_tab]['close'].configure(bg=self.colors['tab_inactive'])
+            refs = self.tab_references[self.active_tab]
+            tab_inactive = self.colors['tab_inactive']
+            refs['button'].configure(bg=tab_inactive)
+            refs['close'].configure(bg=tab_inactive)
         
         # Activate the selected tab
         if note_id in self.tab_references:
-            self.tab_references[note_id]['button'].configure(bg=self.colors['tab_active'])
-            self.tab_references[note_id]['close'].configure(bg=self.colors['tab_active'])
+            refs = self.tab_references[note_id]
+            tab_active = self.colors['tab_active']
+            refs['button'].configure(bg=tab_active)
+            refs['close'].configure(bg=tab_active)
             self.active_tab = note_id
             
             # Load the note content
@@ -903,19 +1442,21 @@ class NotesApp:
         # Remove the tab from the UI
         if note_id in self.tab_references:
             self.tab_references[note_id]['frame'].destroy()
+            self._tabs_width -= self.tab_references[note_id]['width']
             del self.tab_references[note_id]
         
         # Remove from open notes list
-        self.open_notes = [(id, title) for id, title in self.open_notes if id != note_id]
+        self.open_notes_titles.pop(note_id, None)
         
         # If this was the active tab, activate another one if available
         if self.active_tab == note_id:
             self.active_tab = None
-            if self.open_notes:
-                self.activate_tab(self.open_notes[0][0])
+            if self.open_notes_titles:
+                self.activate_tab(next(iter(self.open_notes_titles)))
             else:
                 # No tabs left, clear the editor
                 self.current_note_id = None
+                self._drop_pending_format()
                 self.text_area.delete(1.0, tk.END)
                 self.images_data = {}
                 self.image_counter = 0
@@ -929,16 +1470,18 @@ class NotesApp:
                     'font_size': self.settings['font_size'],
                     'font_family': self.settings['font_family']
                 }
+                self._any_format_active = False
                 
                 # Update formatting buttons
-                self.bold_button.configure(bg=self.colors['button_secondary'])
-                self.italic_button.configure(bg=self.colors['button_secondary'])
-                self.underline_button.configure(bg=self.colors['button_secondary'])
+                button_secondary = self.colors['button_secondary']
+                self.bold_button.configure(bg=button_secondary)
+                self.italic_button.configure(bg=button_secondary)
+                self.underline_button.configure(bg=button_secondary)
                 self.font_size_combo.set(self.current_format['font_size'])
                 self.font_family_combo.set(self.current_format['font_family'])
         
         # Update the tab canvas scrollregion
-        self.tab_canvas.configure(scrollregion=self.tab_canvas.bbox("all"))
+        self._update_tab_scrollregion()
 
     def show_homepage(self):
         # Hide editor page and show homepage
@@ -960,110 +1503,123 @@ class NotesApp:
         else:
             status_bar = self.editor_status_bar
             
+        # A new message replaces one that is still being typed out
+        if self._status_after_id:
+            self.root.after_cancel(self._status_after_id)
+            self._status_after_id = None
+        
         status_bar.config(text="")
         
+        # Reveal the message in at most 10 steps instead of one per character
+        step = max(1, -(-len(message) // 10))
+        
         def update_text(index=0):
-            if index <= len(message):
-                status_bar.config(text=message[:index])
-                self.root.after(30, update_text, index + 1)
+            status_bar.config(text=message[:index])
+            if index < len(message):
+                self._status_after_id = self.root.after(30, update_text, index + step)
+            else:
+                self._status_after_id = None
         
         update_text()
         
     def update_recent_notes(self):
-        # Clear existing widgets in the grid
-        for widget in self.recent_grid.winfo_children():
-            widget.destroy()
-            
-        # Get recent notes
-        recent_notes = get_recent_notes_from_db(6)
+        # The query runs in the background and the grid is filled in once it returns
+        self._recent_request += 1
+        request = self._recent_request
         
-        # Create note cards
-        row, col = 0, 0
-        for note in recent_notes:
-            note_id, title, date_str = note
-            
-            # Format the date - handle both string and datetime formats
-            try:
-                if isinstance(date_str, str):
-                    # Try to parse the date string
-                    try:
-                        date_obj = datetime.strptime(date_str, '%Y-%m-%d %H:%M:%S.%f')
-                    except ValueError:
-                        # If that fails, try without microseconds
-                        date_obj = datetime.strptime(date_str, '%Y-%m-%d %H:%M:%S')
-                    formatted_date = date_obj.strftime('%b %d, %Y')
-                else:
-                    # If it's already a datetime object
-                    formatted_date = date_str.strftime('%b %d, %Y')
-            except (ValueError, TypeError):
-                # If all parsing fails, use a default
-                formatted_date = "Unknown date"
-            
-            # Create a card frame with border
-            card = tk.Frame(
-                self.recent_grid, 
-                bg=self.colors['bg_primary'], 
-                bd=1, 
-                relief="solid",
-                highlightbackground=self.colors['frame_border'],
-                highlightthickness=1
-            )
-            card.grid(row=row, column=col, padx=10, pady=10, sticky="nsew")
-            
-            # Add title
-            note_title = tk.Label(
-                card,
-                text=title if len(title) < 20 else title[:17] + "...",
-                font=("Helvetica", 14, "bold"),
-                bg=self.colors['bg_primary'],
-                fg=self.colors['text_primary'],
-                anchor="w",
-                padx=10,
-                pady=5
-            )
-            note_title.pack(fill="x")
-            
-            # Add date
-            note_date = tk.Label(
-                card,
-                text=f"Last edited: {formatted_date}",
-                font=("Helvetica", 10),
-                bg=self.colors['bg_primary'],
-                fg=self.colors['text_secondary'],
-                anchor="w",
-                padx=10,
-                pady=5
-            )
-            note_date.pack(fill="x")
+        def show(recent_notes):
+            if request == self._recent_request:
+                self._show_recent_notes(recent_notes)
+        
+        self._when_done(_IO_POOL.submit(get_recent_notes_from_db, 6), show)
+    
+    def _show_recent_notes(self, recent_notes):
+        # Nothing to do if the cards already show these notes
+        key = tuple(tuple(note) for note in recent_notes)
+        if key == self._last_recent_key:
+            return
+        self._last_recent_key = key
+        
+        # Create more cards only when there are more notes than cards
+        while len(self._recent_cards) < len(recent_notes):
+            self._recent_cards.append(self._create_recent_card(len(self._recent_cards)))
+        
+        # Fill the cards in place
+        for index, card in enumerate(self._recent_cards):
+            if index >= len(recent_notes):
+                card['frame'].grid_remove()
+                continue
             
-            # Add open button
-            open_btn = tk.Button(
-                card,
-                text="Open",
-                bg=self.colors['button_secondary'],
-                fg=self.colors['text_primary'],
-                font=("Helvetica", 10),
-                relief="flat",
-                padx=10,
-                pady=5,
-                command=lambda id=note_id, t=title: self.open_note_in_tab(id, t)
-            )
-            open_btn.pack(pady=10)
+            note_id, title, updated_ms = recent_notes[index]
             
-            # Update grid position
-            col += 1
-            if col > 2:  # 3 cards per row
-                col = 0
-                row += 1
-                
-        # Configure grid weights for responsiveness
-        for i in range(3):
-            self.recent_grid.columnconfigure(i, weight=1)
-        for i in range(2):
-            self.recent_grid.rowconfigure(i, weight=1)
+            card['title'].configure(text=title if len(title) < 20 else title[:17] + "...")
+            card['date'].configure(text=f"Last edited: {_format_note_date(updated_ms)}")
+            card['open'].configure(command=lambda id=note_id, t=title: self.open_note_in_tab(id, t))
+            card['frame'].grid()
+    
+    def _create_recent_card(self, index):
+        # Create a card frame with border
+        card = tk.Frame(
+            self.recent_grid, 
+            bg=self.colors['bg_primary'], 
+            bd=1, 
+            relief="solid",
+            highlightbackground=self.colors['frame_border'],
+            highlightthickness=1
+        )
+        # 3 cards per row
+        card.grid(row=index // 3, column=index % 3, padx=10, pady=10, sticky="nsew")
+        
+        # Add title
+        note_title = tk.Label(
+            card,
+            font=self._get_font("Helvetica", 14, "bold"),
+            bg=self.colors['bg_primary'],
+            fg=self.colors['text_primary'],
+            anchor="w",
+            padx=10,
+            pady=5
+        )
+        note_title.pack(fill="x")
+        
+        # Add date
+        note_date = tk.Label(
+            card,
+            font=self._get_font("Helvetica", 10),
+            bg=self.colors['bg_primary'],
+            fg=self.colors['text_secondary'],
+            anchor="w",
+            padx=10,
+            pady=5
+        )
+        note_date.pack(fill="x")
+        
+        # Add open button
+        open_btn = tk.Button(
+            card,
+            text="Open",
+            bg=self.colors['button_secondary'],
+            fg=self.colors['text_primary'],
+            font=self._get_font("Helvetica", 10),
+            relief="flat",
+            padx=10,
+            pady=5
+        )
+        open_btn.pack(pady=10)
+        
+        # The cards are recolored with the rest of the UI on theme change
+        self._themed.extend([
+            (card, {'bg': 'bg_primary', 'highlightbackground': 'frame_border'}),
+            (note_title, {'bg': 'bg_primary', 'fg': 'text_primary'}),
+            (note_date, {'bg': 'bg_primary', 'fg': 'text_secondary'}),
+            (open_btn, {'bg': 'button_secondary', 'fg': 'text_primary'}),
+        ])
+        
+        return {'frame': card, 'title': note_title, 'date': note_date, 'open': open_btn}
             
     def new_note(self):
         self.current_note_id = None
+        self._drop_pending_format()
         self.text_area.delete(1.0, tk.END)
         self.images_data = {}  # Clear image data
         self.image_counter = 0
@@ -1077,11 +1633,13 @@ class NotesApp:
             'font_size': self.settings['font_size'],
             'font_family': self.settings['font_family']
         }
+        self._any_format_active = False
         
         # Update formatting buttons
-        self.bold_button.configure(bg=self.colors['button_secondary'])
-        self.italic_button.configure(bg=self.colors['button_secondary'])
-        self.underline_button.configure(bg=self.colors['button_secondary'])
+        button_secondary = self.colors['button_secondary']
+        self.bold_button.configure(bg=button_secondary)
+        self.italic_button.configure(bg=button_secondary)
+        self.underline_button.configure(bg=button_secondary)
         self.font_size_combo.set(self.current_format['font_size'])
         self.font_family_combo.set(self.current_format['font_family'])
         
@@ -1092,6 +1650,7 @@ class NotesApp:
         self.add_tab(None, "Untitled")
 
     def save_note(self):
+        self._do_modified()
         content = self.text_area.get(1.0, tk.END)
 
         if not content.strip():
@@ -1108,24 +1667,19 @@ class NotesApp:
 
         # Save formatting information
         self.save_formatting_data()
+        self._finish_pending_images()
+        content = self._get_note_text()
 
         if self.current_note_id is None:
-            save_note_to_db(title, content, self.images_data, self.formatting_data)
-            # Get the new note ID (last inserted row)
-            conn = sqlite3.connect(DATABASE)
-            c = conn.cursor()
-            c.execute('SELECT last_insert_rowid()')
-            new_id = c.fetchone()[0]
-            conn.close()
+            new_id = save_note_to_db(title, content, self.images_data, self.formatting_data)
             
             self.current_note_id = new_id
             
-            # Update the tab with the new title and ID
-            if self.active_tab is None:
-                self.add_tab(new_id, title)
-            else:
+            # Update the tab with the new title and ID, an unsaved note's tab is keyed None
+            if None in self.tab_references:
                 # Update the existing tab
-                self.close_tab(self.active_tab)
+                self._rename_tab(None, new_id, title)
+            else:
                 self.add_tab(new_id, title)
             
             self.animate_status_bar(f"Note '{title}' saved successfully")
@@ -1134,70 +1688,62 @@ class NotesApp:
             
             # Update the tab title if it exists
             if self.current_note_id in self.tab_references:
-                self.tab_references[self.current_note_id]['button'].configure(text=title)
-                
-                # Update in open_notes list
-                self.open_notes = [(id, title if id == self.current_note_id else t) for id, t in self.open_notes]
+                self._rename_tab(self.current_note_id, self.current_note_id, title)
             
             self.animate_status_bar(f"Note '{title}' updated successfully")
                 
         # Show success message
         messagebox.showinfo("Success", f"Note '{title}' saved successfully")
     
+    def _get_note_text(self):
+        # The text with each embedded image written back as its [IMAGE:id] placeholder
+        # Images deleted from the text are dropped here, so saving does not write their data
+        parts = []
+        live = set()
+        for key, value, index in self.text_area.dump("1.0", tk.END, text=True, image=True):
+            if key == "text":
+                parts.append(value)
+            else:
+                img_id = _image_id(value)
+                live.add(img_id)
+                if img_id in self.images_data:
+                    parts.append(_IMAGE_MARKER.format(img_id))
+        self._forget_images(live)
+        return "".join(parts)
+
     def save_formatting_data(self):
         # Get all formatting tags and their ranges
         self.formatting_data = {
             "bold": [],
             "italic": [],
             "underline": [],
-            "font_size": {},
-            "font_family": {}
+            "font": {}
         }
         
-        # Save bold formatting
-        bold_ranges = self.text_area.tag_ranges("bold")
-        for i in range(0, len(bold_ranges), 2):
-            start = bold_ranges[i]
-            end = bold_ranges[i+1]
-            self.formatting_data["bold"].append((str(start), str(end)))
-        
-        # Save italic formatting
-        italic_ranges = self.text_area.tag_ranges("italic")
-        for i in range(0, len(italic_ranges), 2):
-            start = italic_ranges[i]
-            end = italic_ranges[i+1]
-            self.formatting_data["italic"].append((str(start), str(end)))
-        
-        # Save underline formatting
-        underline_ranges = self.text_area.tag_ranges("underline")
-        for i in range(0, len(underline_ranges), 2):
-            start = underline_ranges[i]
-            end = underline_ranges[i+1]
-            self.formatting_data["underline"].append((str(start), str(end)))
-        
-        # Save font size formatting
-        for size in [8, 10, 12, 14, 16, 18, 20, 24]:
-            tag_name = f"size_{size}"
-            size_ranges = self.text_area.tag_ranges(tag_name)
-            for i in range(0, len(size_ranges), 2):
-                start = size_ranges[i]
-                end = size_ranges[i+1]
-                if str(size) not in self.formatting_data["font_size"]:
-                    self.formatting_data["font_size"][str(size)] = []
-                self.formatting_data["font_size"][str(size)].append((str(start), str(end)))
-        
-        # Save font family formatting
-        # Get all available font families
-        available_fonts = font.families()
-        for family in available_fonts:
-            tag_name = f"family_{family}"
-            family_ranges = self.text_area.tag_ranges(tag_name)
-            for i in range(0, len(family_ranges), 2):
-                start = family_ranges[i]
-                end = family_ranges[i+1]
-                if family not in self.formatting_data["font_family"]:
-                    self.formatting_data["font_family"][family] = []
-                self.formatting_data["font_family"][family].append((str(start), str(end)))
+        formatting_data = self.formatting_data
+        font_tags = self._font_tags
+        
+        def save_range(tag_name, start, end):
+            if tag_name in ("bold", "italic", "underline"):
+                formatting_data[tag_name].append((start, end))
+            elif tag_name in font_tags:
+                # Saved as {family: {size: ranges}}
+                family, size = font_tags[tag_name]
+                formatting_data["font"].setdefault(family, {}).setdefault(str(size), []).append((start, end))
+        
+        # One dump of every tag transition replaces a tag_ranges call per tag
+        opened = {}
+        for key, tag_name, index in self.text_area.dump("1.0", tk.END, tag=True):
+            if key == "tagon":
+                opened[tag_name] = index
+            elif tag_name in opened:
+                save_range(tag_name, opened.pop(tag_name), index)
+        
+        # Tags that are still on run to the end of the text
+        if opened:
+            end = self.text_area.index(tk.END)
+            for tag_name, start in opened.items():
+                save_range(tag_name, start, end)
 
     def open_note_dialog(self):
         # Create a dialog to select a note
@@ -1318,118 +1864,127 @@ class NotesApp:
 
     def open_note_by_id(self, note_id):
         self.current_note_id = note_id
+        self._image_load += 1
         note_content = get_note_content(note_id)
         
         if note_content:
-            self.text_area.delete(1.0, tk.END)
-            self.text_area.insert(1.0, note_content[1])
+            text_area = self.text_area
             
-            # Reset current formatting
-            self.current_format = {
-                'bold': False,
-                'italic': False,
-                'underline': False,
-                'font_size': self.settings['font_size'],
-                'font_family': self.settings['font_family']
-            }
-            
-            # Update formatting buttons
-            self.bold_button.configure(bg=self.colors['button_secondary'])
-            self.italic_button.configure(bg=self.colors['button_secondary'])
-            self.underline_button.configure(bg=self.colors['button_secondary'])
-            self.font_size_combo.set(self.current_format['font_size'])
-            self.font_family_combo.set(self.current_format['font_family'])
-            
-            # Load images if any
-            self.images_data = {}
-            self.image_counter = 0
+            # Unmapped while loading, so Tk does not redo line metrics and redraw after every insert and tag
+            text_area.pack_forget()
+            # The load itself should not end up on the undo stack
+            text_area.configure(autoseparators=False)
+            try:
+                self._load_note_content(note_content)
+            finally:
+                text_area.configure(autoseparators=True)
+                text_area.edit_reset()
+                text_area.pack(fill="both", expand=True, before=self.text_h_scrollbar)
             
-            if note_content[2] and note_content[2] != "{}":
-                try:
-                    # Parse JSON string to dict
-                    self.images_data = json.loads(note_content[2])
-                    
-                    # Display images in text area
-                    for img_id, img_data in self.images_data.items():
-                        try:
-                            # Find the image placeholder in the text
-                            start_idx = "1.0"
-                            while True:
-                                start_idx = self.text_area.search(f"[IMAGE:{img_id}]", start_idx, tk.END)
-                                if not start_idx:
-                                    break
-                                    
-                                # Calculate end index
-                                end_idx = f"{start_idx}+{len(f'[IMAGE:{img_id}]')}c"
-                                
-                                # Delete the placeholder
-                                self.text_area.delete(start_idx, end_idx)
-                                
-                                # Insert the image
-                                img_data_bytes = base64.b64decode(img_data)
-                                img = Image.open(io.BytesIO(img_data_bytes))
-                                # Resize if too large
-                                if img.width > 500:
-                                    ratio = 500 / img.width
-                                    img = img.resize((500, int(img.height * ratio)), Image.LANCZOS)
-                                photo = ImageTk.PhotoImage(img)
-                                
-                                # Store the image to prevent garbage collection
-                                if not hasattr(self, 'image_references'):
-                                    self.image_references = {}
-                                self.image_references[img_id] = photo
-                                
-                                # Insert the image
-                                self.text_area.image_create(start_idx, image=photo)
-                                
-                                # Move to next position
-                                start_idx = end_idx
-                        except Exception as e:
-                            print(f"Error displaying image {img_id}: {e}")
-                    
-                    # Update image counter
-                    if self.images_data:
-                        self.image_counter = max([int(k) for k in self.images_data.keys() if k.isdigit()], default=0) + 1
-                except Exception as e:
-                    print(f"Error parsing images data: {e}")
+            self.animate_status_bar(f"Opened note: {note_content[0]}")
             
-            # Load formatting if any
-            self.formatting_data = {}
-            if note_content[3] and note_content[3] != "{}":
-                try:
-                    # Parse JSON string to dict
-                    self.formatting_data = json.loads(note_content[3])
-                    
-                    # Apply bold formatting
-                    for start, end in self.formatting_data.get("bold", []):
-                        self.text_area.tag_add("bold", start, end)
-                    
-                    # Apply italic formatting
-                    for start, end in self.formatting_data.get("italic", []):
-                        self.text_area.tag_add("italic", start, end)
+    def _load_note_content(self, note_content):
+        self._drop_pending_format()
+        self.text_area.delete(1.0, tk.END)
+        self.text_area.insert(1.0, note_content[1])
+        
+        # Reset current formatting
+        self.current_format = {
+            'bold': False,
+            'italic': False,
+            'underline': False,
+            'font_size': self.settings['font_size'],
+            'font_family': self.settings['font_family']
+        }
+        self._any_format_active = False
+        
+        # Update formatting buttons
+        button_secondary = self.colors['button_secondary']
+        self.bold_button.configure(bg=button_secondary)
+        self.italic_button.configure(bg=button_secondary)
+        self.underline_button.configure(bg=button_secondary)
+        self.font_size_combo.set(self.current_format['font_size'])
+        self.font_family_combo.set(self.current_format['font_family'])
+        
+        # Load images if any
+        self.images_data = {}
+        self.image_counter = 0
+        
+        if note_content[2]:
+            try:
+                self.images_data = note_content[2]
+                
+                # Display images in text area, one forward regexp scan over all placeholders
+                if not hasattr(self, 'image_references'):
+                    self.image_references = {}
+                if self._image_placeholder is None:
+                    self._image_placeholder = tk.PhotoImage(width=1, height=1)
+                embedded = {}
+                match_length = tk.IntVar()
+                start_idx = "1.0"
+                while True:
+                    start_idx = self.text_area.search(_IMAGE_MARKER_PATTERN, start_idx, tk.END,
+                                                      regexp=True, count=match_length)
+                    if not start_idx:
+                        break
                     
-                    # Apply underline formatting
-                    for start, end in self.formatting_data.get("underline", []):
-                        self.text_area.tag_add("underline", start, end)
+                    # Calculate end index and read the id out of the placeholder
+                    end_idx = f"{start_idx}+{match_length.get()}c"
+                    img_id = self.text_area.get(start_idx, end_idx)[_IMAGE_MARKER_ID]
+                    if img_id not in self.images_data:
+                        # Not one of this note's images, leave the text as it is
+                        start_idx = end_idx
+                        continue
                     
-                    # Apply font size formatting
-                    for size, ranges in self.formatting_data.get("font_size", {}).items():
-                        tag_name = f"size_{size}"
-                        self.text_area.tag_configure(tag_name, font=(self.current_format['font_family'], int(size)))
-                        for start, end in ranges:
-                            self.text_area.tag_add(tag_name, start, end)
+                    # Swap the placeholder for a blank image, it is filled in once decoded
+                    self.text_area.delete(start_idx, end_idx)
+                    name = self.text_area.image_create(start_idx, image=self._image_placeholder,
+                                                       name=_IMAGE_NAME.format(img_id))
+                    embedded.setdefault(img_id, []).append(name)
                     
-                    # Apply font family formatting
-                    for family, ranges in self.formatting_data.get("font_family", {}).items():
-                        tag_name = f"family_{family}"
-                        self.text_area.tag_configure(tag_name, font=(family, self.current_format['font_size']))
-                        for start, end in ranges:
-                            self.text_area.tag_add(tag_name, start, end)
-                except Exception as e:
-                    print(f"Error applying formatting: {e}")
-            
-            self.animate_status_bar(f"Opened note: {note_content[0]}")
-            
+                    # The image takes up a single index
+                    start_idx = f"{start_idx}+1c"
+                
+                # Decode each image once in the background
+                for img_id, names in embedded.items():
+                    future = _IO_POOL.submit(_decode_image, self.images_data[img_id])
+                    self._when_done(future, lambda img, img_id=img_id, names=names, load=self._image_load:
+                                    self._install_image(load, img_id, names, img))
+                
+                # Update image counter
+                if self.images_data:
+                    self.image_counter = max([int(k) for k in self.images_data.keys() if k.isdigit()], default=0) + 1
+            except tk.TclError:
+                if __debug__:
+                    _log.exception("Error parsing images data")
+        
+        # Load formatting if any
+        self.formatting_data = {}
+        if note_content[3] and note_content[3] != "{}":
+            try:
+                # Parse JSON string to dict
+                self.formatting_data = _loads(note_content[3])
+                
+                # Apply bold, italic and underline formatting
+                for tag_name in ("bold", "italic", "underline"):
+                    self._tag_add_ranges(tag_name, self.formatting_data.get(tag_name, []))
+                
+                # Apply font formatting
+                for family, sizes in self.formatting_data.get("font", {}).items():
+                    for size, ranges in sizes.items():
+                        self._tag_add_ranges(self._font_tag(family, int(size)), ranges)
+                
+                # Notes saved before the font tags kept font size and font family apart, each on the default of the other
+                default_family, default_size = self.settings['font_family'], self.settings['font_size']
+                for size, ranges in self.formatting_data.get("font_size", {}).items():
+                    self._tag_add_ranges(self._font_tag(default_family, int(size)), ranges)
+                for family, ranges in self.formatting_data.get("font_family", {}).items():
+                    self._tag_add_ranges(self._font_tag(family, default_size), ranges)
+            except (ValueError, TypeError, AttributeError, tk.TclError):
+                # Bad JSON or ranges of the wrong shape, AttributeError when the JSON is not an object
+                if __debug__:
+                    _log.exception("Error applying formatting")
+
     def delete_note(self):
         if self.current_note_id is None:
             self.animate_status_bar("No note is currently open")
@@ -1447,6 +2002,7 @@ class NotesApp:
                 # Clear the editor if this was the active note
                 if self.active_tab is None:
                     self.current_note_id = None
+                    self._drop_pending_format()
                     self.text_area.delete(1.0, tk.END)
                     self.images_data = {}
                     self.image_counter = 0
@@ -1456,106 +2012,65 @@ class NotesApp:
                 messagebox.showinfo("Success", f"Note '{note_content[0]}' deleted successfully")
 
     def toggle_bold(self, event=None):
-        try:
-            # Toggle the current format state
-            self.current_format['bold'] = not self.current_format['bold']
-            
-            # Update button appearance
-            if self.current_format['bold']:
-                self.bold_button.configure(bg=self.colors['button_primary'])
-            else:
-                self.bold_button.configure(bg=self.colors['button_secondary'])
-            
-            # Check if text is selected
-            try:
-                sel_start = self.text_area.index("sel.first")
-                sel_end = self.text_area.index("sel.last")
-                has_selection = True
-            except tk.TclError:
-                # No selection, use current insert position
-                has_selection = False
-                sel_start = self.text_area.index("insert")
-                sel_end = self.text_area.index("insert + 1c")
-                has_selection = False
-            
-            # Apply or remove formatting based on current state
-            if self.current_format['bold']:
-                self.text_area.tag_add("bold", sel_start, sel_end)
-            else:
-                self.text_area.tag_remove("bold", sel_start, sel_end)
-                
-        except Exception as e:
-            print(f"Error in toggle_bold: {e}")
-        
-        return "break"  # Prevent default behavior
+        return self._toggle_format('bold')
 
     def toggle_italic(self, event=None):
-        try:
-            # Toggle the current format state
-            self.current_format['italic'] = not self.current_format['italic']
-            
-            # Update button appearance
-            if self.current_format['italic']:
-                self.italic_button.configure(bg=self.colors['button_primary'])
-            else:
-                self.italic_button.configure(bg=self.colors['button_secondary'])
-            
-            # Check if text is selected
-            try:
-                sel_start = self.text_area.index("sel.first")
-                sel_end = self.text_area.index("sel.last")
-                has_selection = True
-            except tk.TclError:
-                # No selection, use current insert position
-                has_selection = False
-                sel_start = self.text_area.index("insert")
-                sel_end = self.text_area.index("insert + 1c")
-            
-            # Apply or remove formatting based on current state
-            if self.current_format['italic']:
-                self.text_area.tag_add("italic", sel_start, sel_end)
-            else:
-                self.text_area.tag_remove("italic", sel_start, sel_end)
-                
-        except Exception as e:
-            print(f"Error in toggle_italic: {e}")
-        
-        return "break"  # Prevent default behavior
+        return self._toggle_format('italic')
 
     def toggle_underline(self, event=None):
+        return self._toggle_format('underline')
+
+    def _sel_or_insert(self):
+        # (start, end, has_selection), the character after the insert cursor when nothing is selected
+        selection = self.text_area.tag_ranges("sel")
+        if selection:
+            # tag_ranges gives both ends in one call and () without a selection
+            return selection[0], selection[-1], True
+        insert_pos = self.text_area.index("insert")
+        return insert_pos, f"{insert_pos} + 1c", False
+
+    def _toggle_format(self, key):
+        # Shared by the bold, italic and underline toggles, key is both the current_format key and the tag name
+        self._do_modified()
         try:
             # Toggle the current format state
-            self.current_format['underline'] = not self.current_format['underline']
+            current_format = self.current_format
+            active = current_format[key] = not current_format[key]
+            self._update_format_active()
             
             # Update button appearance
-            if self.current_format['underline']:
-                self.underline_button.configure(bg=self.colors['button_primary'])
-            else:
-                self.underline_button.configure(bg=self.colors['button_secondary'])
+            self._format_buttons[key].configure(bg=self.colors['button_primary' if active else 'button_secondary'])
             
-            # Check if text is selected
-            try:
-                sel_start = self.text_area.index("sel.first")
-                sel_end = self.text_area.index("sel.last")
-                has_selection = True
-            except tk.TclError:
-                # No selection, use current insert position
-                has_selection = False
-                sel_start = self.text_area.index("insert")
-                sel_end = self.text_area.index("insert + 1c")
+            # Check if text is selected, otherwise use current insert position
+            sel_start, sel_end, _ = self._sel_or_insert()
             
-            # Apply or remove formatting based on current state
-            if self.current_format['underline']:
-                self.text_area.tag_add("underline", sel_start, sel_end)
-            else:
-                self.text_area.tag_remove("underline", sel_start, sel_end)
+            # Apply or remove formatting based on current state, straight through Tcl like _apply_styles
+            self._tk_call(self.text_area._w, 'tag', 'add' if active else 'remove', key, sel_start, sel_end)
                 
-        except Exception as e:
-            print(f"Error in toggle_underline: {e}")
+        except tk.TclError:
+            if __debug__:
+                _log.exception("Error in toggle_%s", key)
         
         return "break"  # Prevent default behavior
 
+    def _schedule_settings_save(self):
+        # Stepping through sizes or fonts writes the settings once, after the changes stop
+        if self._settings_save_job:
+            self.root.after_cancel(self._settings_save_job)
+        self._settings_save_job = self.root.after(500, self._save_settings_now)
+
+    def _save_settings_now(self):
+        self._settings_save_job = None
+        save_settings(self.settings)
+
+    def on_close(self):
+        if self._settings_save_job:
+            self.root.after_cancel(self._settings_save_job)
+            self._save_settings_now()
+        self.root.destroy()
+
     def change_font_size(self, event=None):
+        self._do_modified()
         try:
             # Get the selected font size
             try:
@@ -1566,135 +2081,95 @@ class NotesApp:
             
             # Update current format state
             self.current_format['font_size'] = font_size
+            self._update_format_active()
             
             # Check if text is selected
-            try:
-                sel_start = self.text_area.index("sel.first")
-                sel_end = self.text_area.index("sel.last")
-                has_selection = True
-            except tk.TclError:
+            sel_start, sel_end, has_selection = self._sel_or_insert()
+            if not has_selection:
                 # No selection, change default font size
-                has_selection = False
-                
-                # Change the default font size for the text area
-                current_font = font.nametofont(self.text_area["font"])
-                new_font = font.Font(family=current_font.cget("family"), size=font_size)
+                # Change the default font size for the text area, the family is already known from the settings
+                family = self.settings['font_family']
+                new_font = self._get_font(family, font_size)
                 self.text_area.configure(font=new_font)
                 
                 # Update all formatting tags with the new base font size
-                self.text_area.tag_configure("bold", font=(current_font.cget("family"), font_size, "bold"))
-                self.text_area.tag_configure("italic", font=(current_font.cget("family"), font_size, "italic"))
-                self.text_area.tag_configure("underline", font=(current_font.cget("family"), font_size, "underline"))
-                self.text_area.tag_configure("bold-italic", font=(current_font.cget("family"), font_size, "bold italic"))
-                self.text_area.tag_configure("bold-underline", font=(current_font.cget("family"), font_size, "bold underline"))
-                self.text_area.tag_configure("italic-underline", font=(current_font.cget("family"), font_size, "italic underline"))
-                self.text_area.tag_configure("bold-italic-underline", font=(current_font.cget("family"), font_size, "bold italic underline"))
+                self._reconfigure_base_styles(family, font_size)
                 
                 # Update settings
                 self.settings['font_size'] = font_size
-                save_settings(self.settings)
+                self._update_format_active()
+                self._schedule_settings_save()
                 
                 self.animate_status_bar(f"Default font size changed to {font_size}")
                 return
             
             # If there's a selection, apply the font size to the selected text
             if has_selection:
-                # Remove any existing font size tags from the selection
-                for size in [8, 10, 12, 14, 16, 18, 20, 24]:
-                    tag_name = f"size_{size}"
-                    self.text_area.tag_remove(tag_name, sel_start, sel_end)
-                
-                # Create a new tag for this font size
-                tag_name = f"size_{font_size}"
-                
-                # Get the current font family from the selection or use default
-                current_family = self.current_format['font_family']
-                for tag in self.text_area.tag_names(sel_start):
-                    if tag.startswith("family_"):
-                        current_family = tag[7:]  # Remove "family_" prefix
-                        break
+                # The selection keeps the family it starts with
+                (family, _), present = self._font_tags_in(sel_start, sel_end)
                 
-                # Configure the tag with the selected font size and current family
-                self.text_area.tag_configure(tag_name, font=(current_family, font_size))
+                # Remove the font tags that are on the selection, typically none or one
+                for tag in present:
+                    self.text_area.tag_remove(tag, sel_start, sel_end)
                 
-                # Apply the tag to the selected text
-                self.text_area.tag_add(tag_name, sel_start, sel_end)
+                # Apply the tag for this family and font size to the selected text
+                self.text_area.tag_add(self._font_tag(family, font_size), sel_start, sel_end)
             
             # Update status bar
             self.animate_status_bar(f"Font size changed to {font_size}")
             
-        except Exception as e:
-            print(f"Error in change_font_size: {e}")
+        except tk.TclError:
+            if __debug__:
+                _log.exception("Error in change_font_size")
 
     def change_font_family(self, event=None):
+        self._do_modified()
         try:
             # Get the selected font family
             font_family = self.font_family_combo.get()
             
             # Update current format state
             self.current_format['font_family'] = font_family
+            self._update_format_active()
             
             # Check if text is selected
-            try:
-                sel_start = self.text_area.index("sel.first")
-                sel_end = self.text_area.index("sel.last")
-                has_selection = True
-            except tk.TclError:
+            sel_start, sel_end, has_selection = self._sel_or_insert()
+            if not has_selection:
                 # No selection, change default font family
-                has_selection = False
-                
-                # Change the default font family for the text area
-                current_font = font.nametofont(self.text_area["font"])
-                new_font = font.Font(family=font_family, size=current_font.cget("size"))
+                # Change the default font family for the text area, the size is already known from the settings
+                size = self.settings['font_size']
+                new_font = self._get_font(font_family, size)
                 self.text_area.configure(font=new_font)
                 
                 # Update all formatting tags with the new base font family
-                self.text_area.tag_configure("bold", font=(font_family, current_font.cget("size"), "bold"))
-                self.text_area.tag_configure("italic", font=(font_family, current_font.cget("size"), "italic"))
-                self.text_area.tag_configure("underline", font=(font_family, current_font.cget("size"), "underline"))
-                self.text_area.tag_configure("bold-italic", font=(font_family, current_font.cget("size"), "bold italic"))
-                self.text_area.tag_configure("bold-underline", font=(font_family, current_font.cget("size"), "bold underline"))
-                self.text_area.tag_configure("italic-underline", font=(font_family, current_font.cget("size"), "italic underline"))
-                self.text_area.tag_configure("bold-italic-underline", font=(font_family, current_font.cget("size"), "bold italic underline"))
+                self._reconfigure_base_styles(font_family, size)
                 
                 # Update settings
                 self.settings['font_family'] = font_family
-                save_settings(self.settings)
+                self._update_format_active()
+                self._schedule_settings_save()
                 
                 self.animate_status_bar(f"Default font changed to {font_family}")
                 return
             
             # If there's a selection, apply the font family to the selected text
             if has_selection:
-                # Remove any existing font family tags from the selection
-                for tag in list(self.text_area.tag_names(sel_start)):
-                    if tag.startswith("family_"):
-                        self.text_area.tag_remove(tag, sel_start, sel_end)
+                # The selection keeps the size it starts with
+                (_, size), present = self._font_tags_in(sel_start, sel_end)
                 
-                # Create a new tag for this font family
-                tag_name = f"family_{font_family}"
-                
-                # Get the current font size from the selection or use default
-                current_size = self.current_format['font_size']
-                for tag in self.text_area.tag_names(sel_start):
-                    if tag.startswith("size_"):
-                        try:
-                            current_size = int(tag[5:])  # Remove "size_" prefix
-                        except ValueError:
-                            pass
-                        break
+                # Remove the font tags that are on the selection, including ones that start inside it
+                for tag in present:
+                    self.text_area.tag_remove(tag, sel_start, sel_end)
                 
-                # Configure the tag with the selected font family and current size
-                self.text_area.tag_configure(tag_name, font=(font_family, current_size))
-                
-                # Apply the tag to the selected text
-                self.text_area.tag_add(tag_name, sel_start, sel_end)
+                # Apply the tag for this font family and size to the selected text
+                self.text_area.tag_add(self._font_tag(font_family, size), sel_start, sel_end)
             
             # Update status bar
             self.animate_status_bar(f"Font changed to {font_family}")
             
-        except Exception as e:
-            print(f"Error in change_font_family: {e}")
+        except tk.TclError:
+            if __debug__:
+                _log.exception("Error in change_font_family")
             
     def insert_image(self):
         # Open file dialog to select an image
@@ -1705,13 +2180,12 @@ class NotesApp:
         
         if file_path:
             try:
-                # Open and resize the image if needed
-                img = Image.open(file_path)
+                # Read the file once, the same bytes are decoded for display and kept for saving
+                _require_pil()
+                img_data = _read_image_file(file_path)
                 
-                # Resize if too large
-                if img.width > 500:
-                    ratio = 500 / img.width
-                    img = img.resize((500, int(img.height * ratio)), Image.LANCZOS)
+                # Resize if too large, JPEGs are first decoded at a reduced scale that is still at least 500px
+                img = _fit_image(Image.open(io.BytesIO(img_data)), Image.LANCZOS)
                 
                 # Convert image to PhotoImage for display
                 photo = ImageTk.PhotoImage(img)
@@ -1727,48 +2201,123 @@ class NotesApp:
                 # Store the reference
                 self.image_references[img_id] = photo
                 
-                # Insert the image at the current cursor position
-                current_position = self.text_area.index(tk.INSERT)
-                self.text_area.image_create(current_position, image=photo)
-                
-                # Store the image data in base64 format
-                with open(file_path, "rb") as img_file:
-                    img_data = base64.b64encode(img_file.read()).decode('utf-8')
-                    self.images_data[img_id] = img_data
+                # Insert the image at the current cursor position, its name carries the id for saving
+                self.text_area.image_create(tk.INSERT, image=photo, name=_IMAGE_NAME.format(img_id))
                 
-                # Insert a hidden marker for the image position
-                # This will be used when saving/loading the note
-                self.text_area.insert(current_position, f"[IMAGE:{img_id}]")
-                self.text_area.delete(current_position, f"{current_position}+{len(f'[IMAGE:{img_id}]')}c")
+                # Keep the raw bytes of the image file
+                self.images_data[img_id] = img_data
+                self._prune_images()
                 
                 self.animate_status_bar(f"Image inserted successfully")
                 
-            except Exception as e:
-                print(f"Error inserting image: {e}")
+            except (OSError, tk.TclError):
+                # OSError also covers files PIL cannot identify
+                if __debug__:
+                    _log.exception("Error inserting image")
+        
+    def _when_done(self, future, callback):
+        # Tk may only be used from the main thread, so background results are picked up by polling
+        if not future.done():
+            self.root.after(50, self._when_done, future, callback)
+            return
+        try:
+            result = future.result()
+        except (OSError, ValueError, sqlite3.Error):
+            # Image decoding and the recent notes query, OSError also covers images PIL cannot identify
+            if __debug__:
+                _log.exception("Background task error")
+            return
+        callback(result)
+
+    def _install_image(self, load, img_id, names, img):
+        # A different note has been opened since the decode started
+        if load != self._image_load:
+            return
+        photo = ImageTk.PhotoImage(img)
         
+        # Store the image to prevent garbage collection
+        self.image_references[img_id] = photo
+        for name in names:
+            try:
+                self.text_area.image_configure(name, image=photo)
+            except tk.TclError:
+                # The image was deleted from the text while it was loading
+                pass
+
+    def _prune_images(self):
+        # Every 8th insert, free the memory of images that are no longer in the text; saving prunes as well
+        self._image_inserts += 1
+        if self._image_inserts % 8:
+            return
+        self._forget_images({_image_id(name)
+                             for key, name, index in self.text_area.dump("1.0", tk.END, image=True)})
+
+    def _forget_images(self, live):
+        # Drop the photos and data of every image whose id is not in live
+        if not hasattr(self, 'image_references'):
+            self.image_references = {}
+        for images in (self.image_references, self.images_data):
+            for img_id in images.keys() - live:
+                del images[img_id]
+
+    def _store_image_data(self, img_id, future):
+        # images_data holds the raw file or PNG bytes, they go into note_images as they are and are never base64 encoded
+        # The data goes into the images of the note the image was inserted into, even if another note is open by then
+        images_data = self.images_data
+        self._pending_images[future] = (images_data, img_id)
+
+        def store(img_data):
+            if self._pending_images.pop(future, None):
+                images_data[img_id] = img_data
+
+        self._when_done(future, store)
+
+    def _finish_pending_images(self):
+        # Wait for images of the current note that are still being encoded
+        for future, (images_data, img_id) in list(self._pending_images.items()):
+            if images_data is not self.images_data:
+                continue
+            del self._pending_images[future]
+            try:
+                images_data[img_id] = future.result()
+            except (OSError, ValueError):
+                if __debug__:
+                    _log.exception("Error encoding image %s", img_id)
+
     def on_window_resize(self, event=None):
         # Only respond to the root window's resize events
         if event and event.widget == self.root:
-            # Update the layout for responsiveness
-            if hasattr(self, 'recent_grid') and self.homepage_frame.winfo_ismapped():
-                self.update_recent_notes()
+            # Configure also fires for moves, only a new size needs a relayout
+            size = (event.width, event.height)
+            if size == self._last_root_size:
+                return
+            self._last_root_size = size
             
-            # Update the tab canvas scrollregion
-            if hasattr(self, 'tab_canvas'):
-                self.tab_canvas.configure(scrollregion=self.tab_canvas.bbox("all"))
+            # A drag sends many events, relayout once it settles
+            if self._resize_job:
+                self.root.after_cancel(self._resize_job)
+            self._resize_job = self.root.after(100, self._do_resize)
+
+    def _do_resize(self):
+        self._resize_job = None
+        # Update the layout for responsiveness
+        if hasattr(self, 'recent_grid') and self.homepage_frame.winfo_ismapped():
+            self.update_recent_notes()
+        
+        # Update the tab canvas scrollregion
+        if hasattr(self, 'tab_canvas'):
+            self._update_tab_scrollregion()
 
     def paste_from_clipboard(self, event=None):
         try:
-            from PIL import ImageGrab
+            _require_image_grab()
             img = ImageGrab.grabclipboard()
             if isinstance(img, Image.Image):
-                if img.width > 500:
-                    ratio = 500 / img.width
-                    img = img.resize((500, int(img.height * ratio)), Image.LANCZOS)
+                # The clipboard bitmap is already decoded, so only the in-place shrink applies
+                _fit_image(img, Image.LANCZOS)
                 photo = ImageTk.PhotoImage(img)
 
                 # Insert image
-                current_position = self.text_area.index(tk.INSERT)
                 img_id = str(self.image_counter)
                 self.image_counter += 1
 
@@ -1776,23 +2325,21 @@ class NotesApp:
                     self.image_references = {}
                 self.image_references[img_id] = photo
 
-                self.text_area.image_create(current_position, image=photo)
-                self.text_area.insert(current_position, f"[IMAGE:{img_id}]")
-                self.text_area.delete(current_position, f"{current_position}+{len(f'[IMAGE:{img_id}]')}c")
+                self.text_area.image_create(tk.INSERT, image=photo, name=_IMAGE_NAME.format(img_id))
 
-                # Store base64 image data
-                buffer = io.BytesIO()
-                img.save(buffer, format="PNG")
-                img_data = base64.b64encode(buffer.getvalue()).decode('utf-8')
-                self.images_data[img_id] = img_data
+                # Store the image as PNG bytes
+                self._store_image_data(img_id, _IO_POOL.submit(_encode_image, img))
+                self._prune_images()
 
                 self.animate_status_bar("Image pasted from clipboard")
             else:
                 # fallback to text
                 text = self.root.clipboard_get()
                 self.text_area.insert(tk.INSERT, text)
-        except Exception as e:
-            print(f"Paste error: {e}")
+        except (OSError, NotImplementedError, tk.TclError):
+            # ImageGrab raises NotImplementedError where it has no clipboard tool, clipboard_get a TclError when it is empty
+            if __debug__:
+                _log.exception("Paste error")
 
 
 if __name__ == "__main__":
@@ -1811,7 +2358,7 @@ if __name__ == "__main__":
     try:
         icon_path = os.path.join(os.path.dirname(__file__), "icon.png")
         if os.path.exists(icon_path):
-            icon = ImageTk.PhotoImage(file=icon_path)
+            icon = tk.PhotoImage(file=icon_path)
             root.iconphoto(True, icon)
     except Exception as e:
         print(f"Error setting icon: {e}")